@@ -0,0 +1,48 @@
+"""Authenticated index latency with and without hole-punched page caching.
+
+Without holes every request of a logged-in user runs the view and renders
+the page, with holes it only renders the header and the feed switcher.
+"""
+from benchmarks.utils import benchmark_environment, measure, report, setup
+
+POSTS = 30
+
+
+def create_posts():
+    from django.contrib.auth import get_user_model
+    from posts.models import Group, Post
+
+    author = get_user_model().objects.create_user(username='benchmark')
+    group = Group.objects.create(
+        title='Группа', slug='benchmark', description='Описание'
+    )
+    Post.objects.bulk_create(
+        Post(author=author, group=group, text=f'Пост {number}')
+        for number in range(POSTS)
+    )
+    return author
+
+
+def main():
+    setup()
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    with benchmark_environment():
+        client = Client()
+        client.force_login(create_posts())
+        url = reverse('posts:index')
+        for label, enabled in (('without holes', False), ('with holes', True)):
+            with override_settings(PAGE_CACHE_AUTHENTICATED=enabled):
+                cache.clear()
+                client.get(url)
+                report(
+                    f'authenticated index, {label}',
+                    measure(lambda: client.get(url), repeat=200),
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Media serving throughput: django.views.static.serve vs serve_media."""
+import os
+
+from benchmarks.utils import benchmark_environment, measure, report, setup
+
+FILE_SIZE = 1024 * 1024
+NAME = 'cache/ab/cd/abcdef0123456789abcdef0123456789.jpg'
+
+
+def consume(response):
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    response.close()
+    return size
+
+
+def main():
+    setup()
+    from django.conf import settings
+    from django.test import RequestFactory
+    from django.views.static import serve
+
+    from core.media import serve_media
+
+    with benchmark_environment():
+        path = os.path.join(settings.MEDIA_ROOT, NAME)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as file:
+            file.write(os.urandom(FILE_SIZE))
+        factory = RequestFactory()
+        views = {
+            'static.serve': lambda request: serve(
+                request, NAME, document_root=settings.MEDIA_ROOT
+            ),
+            'serve_media': lambda request: serve_media(request, NAME),
+        }
+        last_modified = serve_media(factory.get('/'), NAME)['Last-Modified']
+        cases = {
+            'full GET': {},
+            'If-Modified-Since': {'HTTP_IF_MODIFIED_SINCE': last_modified},
+            'Range 64 KiB': {'HTTP_RANGE': 'bytes=0-65535'},
+        }
+        for case, headers in cases.items():
+            for label, view in views.items():
+                request = factory.get('/', **headers)
+                sizes = []
+                timings = measure(
+                    lambda: sizes.append(consume(view(request))), repeat=200
+                )
+                megabytes = sum(sizes) / 1024 / 1024
+                report(f'{case}: {label}', timings)
+                print(f'{"":<45} {megabytes / sum(timings):8.1f} MB/s, '
+                      f'{len(timings) / sum(timings):8.0f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Replay recorded traffic against the WSGI application.
+
+Requests are read from access logs in the common or combined format, or
+from JSONL traces with one object per line::
+
+    {"method": "GET", "path": "/posts/1/", "user": "leo",
+     "headers": {"Accept-Language": "en"}, "body": ""}
+
+Only ``path`` (or ``url``) is required; ``user`` replays the request with a
+session of that user. Such sessions are created in the configured session
+store for the replay and deleted when it ends. The trace is sent to
+``yatube.wsgi.application`` directly, from a pool of threads, and
+throughput, error rate and latency histograms are reported per URL name::
+
+    python -m benchmarks.replay access.log --concurrency 8 --loops 3
+
+By default the configured database is used, so that a trace recorded in
+production meets the data it was recorded against; ``--generate`` runs it
+against a throwaway dataset made by ``generate_data`` instead.
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from urllib.parse import unquote_to_bytes, urlsplit
+
+from benchmarks.utils import benchmark_environment, percentile, setup
+
+ACCESS_LOG = re.compile(
+    r'^\S+ \S+ \S+ \[[^\]]+\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*"'
+)
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, float('inf'))
+UNRESOLVED = '<unresolved>'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('traces', nargs='+', help='Access logs or JSONL.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--loops', type=int, default=1)
+    parser.add_argument('--limit', type=int, help='Replay at most N lines.')
+    parser.add_argument(
+        '--methods', default='GET,HEAD',
+        help='Methods to replay; others are skipped.',
+    )
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument(
+        '--generate', action='store_true',
+        help='Replay against a generated dataset in a throwaway database.',
+    )
+    return parser.parse_args()
+
+
+def parse_line(line):
+    """Return a request dict for a trace or access log line, or ``None``."""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        target = entry.get('path') or entry.get('url')
+        if not target:
+            return None
+    else:
+        match = ACCESS_LOG.match(line)
+        if match is None:
+            return None
+        entry = {'method': match['method']}
+        target = match['target']
+    url = urlsplit(target)
+    return {
+        'method': entry.get('method', 'GET').upper(),
+        'path': url.path or '/',
+        'query': url.query,
+        'headers': entry.get('headers', {}),
+        'body': entry.get('body', ''),
+        'user': entry.get('user'),
+    }
+
+
+def read_traces(paths, methods, limit):
+    entries, skipped = [], 0
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                entry = parse_line(line)
+                if entry is None:
+                    skipped += bool(line.strip())
+                elif entry['method'] in methods:
+                    entries.append(entry)
+    if skipped:
+        print(f'Skipped {skipped} unparsable lines.', file=sys.stderr)
+    return entries[:limit]
+
+
+def url_name(path):
+    from django.urls import Resolver404, resolve
+
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return UNRESOLVED
+
+
+@contextmanager
+def session_cookies(usernames):
+    """Log every user in once and yield their session cookies.
+
+    The sessions are saved to the configured store, which may well be the
+    production one, so they are deleted again on the way out.
+    """
+    from importlib import import_module
+
+    from django.conf import settings
+    from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                     SESSION_KEY, get_user_model)
+
+    engine = import_module(settings.SESSION_ENGINE)
+    cookies, sessions = {}, []
+    try:
+        for user in get_user_model().objects.filter(username__in=usernames):
+            session = engine.SessionStore()
+            session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+            session[BACKEND_SESSION_KEY] = (
+                settings.AUTHENTICATION_BACKENDS[0]
+            )
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            sessions.append(session)
+            cookies[user.username] = (
+                f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+            )
+        yield cookies
+    finally:
+        for session in sessions:
+            session.delete()
+
+
+def make_environ(entry, host, cookie):
+    body = entry['body'].encode()
+    environ = {
+        'REQUEST_METHOD': entry['method'],
+        # PEP 3333 wants the undecoded path as a latin-1 string.
+        'PATH_INFO': unquote_to_bytes(entry['path']).decode('iso-8859-1'),
+        'QUERY_STRING': entry['query'],
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': host,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for header, value in entry['headers'].items():
+        key = header.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        environ[key] = value
+    if cookie is not None:
+        environ['HTTP_COOKIE'] = cookie
+    return environ
+
+
+def send(application, environ):
+    """Return ``(status, seconds)``; the status is ``None`` on exceptions."""
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+        return lambda data: None
+
+    start = time.perf_counter()
+    try:
+        result = application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+    except Exception:
+        return None, time.perf_counter() - start
+    return int(statuses[0].split()[0]), time.perf_counter() - start
+
+
+def replay(application, entries, host, concurrency, loops):
+    """Return the results per URL name and the wall time of the replay."""
+    names = {entry['path']: None for entry in entries}
+    for path in names:
+        names[path] = url_name(path)
+    usernames = {entry['user'] for entry in entries if entry['user']}
+    results = defaultdict(list)
+    lock = threading.Lock()
+
+    with session_cookies(usernames) as cookies:
+        def run(entry):
+            environ = make_environ(entry, host, cookies.get(entry['user']))
+            status, seconds = send(application, environ)
+            with lock:
+                results[names[entry['path']]].append((status, seconds))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run, entries * loops))
+        return results, time.perf_counter() - start
+
+
+def histogram(timings):
+    counts = [0] * len(BUCKETS)
+    for seconds in timings:
+        milliseconds = seconds * 1000
+        index = next(i for i, edge in enumerate(BUCKETS)
+                     if milliseconds <= edge)
+        counts[index] += 1
+    return counts
+
+
+def print_report(results, elapsed):
+    total = sum(len(samples) for samples in results.values())
+    errors = sum(
+        1 for samples in results.values() for status, _ in samples
+        if status is None or status >= 500
+    )
+    print(
+        f'{total} requests in {elapsed:.2f} s: {total / elapsed:.1f} req/s, '
+        f'errors {errors / total:.1%}\n'
+    )
+    print(
+        f'{"url name":<32} {"requests":>8} {"req/s":>7} {"4xx":>6} '
+        f'{"errors":>6} {"p50":>8} {"p95":>8} {"p99":>8}'
+    )
+    for name, samples in sorted(results.items()):
+        statuses = [status for status, _ in samples]
+        timings = [seconds for _, seconds in samples]
+        client_errors = sum(
+            1 for status in statuses if status and 400 <= status < 500
+        )
+        server_errors = sum(
+            1 for status in statuses if status is None or status >= 500
+        )
+        print(
+            f'{name:<32} {len(samples):>8} {len(samples) / elapsed:7.1f} '
+            f'{client_errors / len(samples):6.1%} '
+            f'{server_errors / len(samples):6.1%} '
+            f'{statistics.median(timings) * 1000:8.2f} '
+            f'{percentile(timings, 0.95) * 1000:8.2f} '
+            f'{percentile(timings, 0.99) * 1000:8.2f}'
+        )
+    edges = [f'≤{edge}' for edge in BUCKETS[:-1]] + [f'>{BUCKETS[-2]}']
+    print(f'\n{"latency, ms":<32} ' + ' '.join(f'{e:>6}' for e in edges))
+    for name, samples in sorted(results.items()):
+        counts = histogram(seconds for _, seconds in samples)
+        print(f'{name:<32} ' + ' '.join(f'{c:>6}' for c in counts))
+
+
+def main():
+    options = parse_args()
+    setup()
+    from django.core.management import call_command
+
+    from yatube.wsgi import application
+
+    methods = set(options.methods.upper().split(','))
+    entries = read_traces(options.traces, methods, options.limit)
+    if not entries:
+        sys.exit('No requests to replay.')
+
+    def run():
+        results, elapsed = replay(
+            application, entries, options.host,
+            options.concurrency, options.loops,
+        )
+        print_report(results, elapsed)
+
+    if not options.generate:
+        run()
+        return
+    with benchmark_environment():
+        call_command('generate_data', stdout=StringIO())
+        run()
+
+
+if __name__ == '__main__':
+    main()
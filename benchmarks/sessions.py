@@ -0,0 +1,77 @@
+"""Queries per authenticated request with database and cached sessions.
+
+Every view is requested twice per engine and the second, steady state
+request is counted; page caching is disabled so the views really run.
+"""
+from benchmarks.utils import benchmark_environment, setup
+
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def get_urls(author, post):
+    from django.urls import reverse
+
+    return (
+        reverse('posts:index'),
+        reverse('posts:group_list', kwargs={'slug': post.group.slug}),
+        reverse('posts:profile', kwargs={'username': author.username}),
+        reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        reverse('posts:follow_index'),
+        reverse('posts:post_create'),
+        reverse('users:password_change'),
+        reverse('users:password_change_done'),
+        reverse('about:author'),
+    )
+
+
+def capture_queries(engine, urls, author):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, override_settings
+
+    captured = {}
+    with override_settings(SESSION_ENGINE=engine):
+        client = Client()
+        client.force_login(author)
+        for url in urls:
+            client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            captured[url] = [query['sql'] for query in queries]
+    return captured
+
+
+def main():
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.test.utils import override_settings
+    from posts.models import Group, Post
+
+    with benchmark_environment(), override_settings(
+        PAGE_CACHE_AUTHENTICATED=False
+    ):
+        author = get_user_model().objects.create_user(username='benchmark')
+        group = Group.objects.create(
+            title='Группа', slug='benchmark', description='Описание'
+        )
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        urls = get_urls(author, post)
+        db, cached = (
+            capture_queries(engine, urls, author) for engine in ENGINES
+        )
+        print(f'{"view":<30} {"db":>4} {"cached":>7} {"session":>8}')
+        for url in urls:
+            sessions = sum('django_session' in sql for sql in cached[url])
+            print(
+                f'{url:<30} {len(db[url]):>4} {len(cached[url]):>7} '
+                f'{sessions:>8}'
+            )
+        saved = sum(len(db[url]) - len(cached[url]) for url in urls)
+        print(f'{saved} queries saved over {len(urls)} requests')
+
+
+if __name__ == '__main__':
+    main()
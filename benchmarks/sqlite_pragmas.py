@@ -0,0 +1,122 @@
+"""Throughput of concurrent readers and writers with and without pragmas.
+
+Readers run the index page query, writers add comments, all in their own
+threads and connections against a database file. "database is locked"
+errors are counted rather than retried.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import setup
+
+READERS = 8
+WRITERS = 4
+DURATION = 3.0
+SQLITE_DEFAULTS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 5000,
+}
+
+
+def worker(work, stop, results):
+    from django.db import OperationalError, connection
+
+    done = errors = 0
+    try:
+        while not stop.is_set():
+            try:
+                work()
+                done += 1
+            except OperationalError:
+                errors += 1
+    finally:
+        connection.close()
+    results.append((done, errors))
+
+
+def run(post, author):
+    from django.db import connection
+    from django.utils import timezone
+
+    # Plain SQL keeps Python overhead, and so GIL contention between the
+    # threads, low enough for the database locks to dominate.
+    def read():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT p.id, p.text, u.username FROM posts_post p '
+                'JOIN auth_user u ON u.id = p.author_id '
+                'ORDER BY p.pub_date DESC LIMIT 10'
+            )
+            cursor.fetchall()
+
+    def write():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO posts_comment '
+                '(post_id, author_id, text, created) VALUES (%s, %s, %s, %s)',
+                [post.pk, author.pk, 'Комментарий', timezone.now()],
+            )
+
+    stop = threading.Event()
+    reads, writes = [], []
+    threads = [
+        threading.Thread(target=worker, args=(read, stop, reads))
+        for _ in range(READERS)
+    ] + [
+        threading.Thread(target=worker, args=(write, stop, writes))
+        for _ in range(WRITERS)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return [
+        (sum(done for done, _ in results), sum(err for _, err in results))
+        for results in (reads, writes)
+    ]
+
+
+def main():
+    setup()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import override_settings
+    from posts.models import Post
+
+    scenarios = (
+        ('sqlite defaults', SQLITE_DEFAULTS),
+        ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+    )
+    for label, pragmas in scenarios:
+        directory = tempfile.mkdtemp()
+        connection.settings_dict['TEST'] = {
+            'NAME': os.path.join(directory, 'benchmark.sqlite3')
+        }
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                author = get_user_model().objects.create_user(
+                    username='benchmark'
+                )
+                post = Post.objects.create(author=author, text='Пост')
+                connection.close()
+                (reads, read_errors), (writes, write_errors) = run(
+                    post, author
+                )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        print(
+            f'{label:<20} '
+            f'reads {reads / DURATION:8.0f}/s ({read_errors} locked)  '
+            f'writes {writes / DURATION:7.0f}/s ({write_errors} locked)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Index render time on the first request and in steady state.
+
+The first request is simulated by emptying the cached template loader,
+with and without precompiling the templates beforehand; caches are
+cleared before every request so the page is really rendered.
+"""
+from benchmarks.utils import benchmark_environment, measure, report, setup
+
+POSTS = 10
+
+
+def main():
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.template import engines
+    from django.test import Client
+    from django.urls import reverse
+    from core.precompile import precompile_templates
+    from posts.models import Group, Post
+
+    loader = engines['django'].engine.template_loaders[0]
+
+    def cold():
+        cache.clear()
+        loader.reset()
+
+    def precompiled():
+        cold()
+        precompile_templates()
+
+    with benchmark_environment():
+        author = get_user_model().objects.create_user(username='benchmark')
+        group = Group.objects.create(
+            title='Группа', slug='benchmark', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=group, text=f'Пост {number}')
+            for number in range(POSTS)
+        )
+        client = Client()
+        url = reverse('posts:index')
+        client.get(url)
+        report(
+            'first request, cold loader',
+            measure(lambda: client.get(url), before=cold),
+        )
+        report(
+            'first request, precompiled',
+            measure(lambda: client.get(url), before=precompiled),
+        )
+        report(
+            'steady state',
+            measure(lambda: client.get(url), before=cache.clear),
+        )
+        report(
+            'precompile_templates()',
+            measure(precompile_templates, before=loader.reset),
+        )
+
+
+if __name__ == '__main__':
+    main()
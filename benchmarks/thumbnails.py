@@ -0,0 +1,79 @@
+"""Page render time with and without thumbnail record prefetching."""
+from io import BytesIO
+
+from benchmarks.utils import benchmark_environment, measure, report, setup
+
+POSTS = 10
+THUMBNAILS = (
+    '{% load thumbnail %}'
+    '{% for post in page_obj %}'
+    '{% thumbnail post.image "960x339" upscale=True as im %}{{ im.url }}'
+    '{% endthumbnail %}'
+    '{% endfor %}'
+)
+PREFETCH = (
+    '{% load post_thumbnails %}'
+    '{% prefetch_thumbnails page_obj "960x339" upscale=True %}'
+)
+
+
+def create_posts():
+    from django.contrib.auth import get_user_model
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+    from posts.models import Post
+
+    author = get_user_model().objects.create_user(username='benchmark')
+    for number in range(POSTS):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), (number * 20, 0, 0)).save(
+            buffer, 'JPEG'
+        )
+        Post.objects.create(
+            author=author,
+            text=f'Пост {number}',
+            image=SimpleUploadedFile(
+                f'{number}.jpg', buffer.getvalue(), 'image/jpeg'
+            ),
+        )
+
+
+def main():
+    setup()
+    from django.core.cache import cache
+    from django.core.paginator import Paginator
+    from django.template import engines
+    from posts.models import Post
+
+    with benchmark_environment():
+        create_posts()
+        django_engine = engines['django']
+        templates = {
+            'without prefetch': django_engine.from_string(THUMBNAILS),
+            'with prefetch': django_engine.from_string(PREFETCH + THUMBNAILS),
+        }
+        page = Paginator(Post.objects.all(), POSTS).get_page(1)
+        context = {'page_obj': page}
+        templates['without prefetch'].render(context)
+        for label, template in templates.items():
+            report(
+                f'{label}, cold cache',
+                measure(lambda: template.render(context), before=cache.clear),
+            )
+            report(
+                f'{label}, warm cache',
+                measure(lambda: template.render(context)),
+            )
+        report(
+            'post_list.html, cold cache',
+            measure(
+                lambda: django_engine.get_template(
+                    'includes/posts/post_list.html'
+                ).render(context),
+                before=cache.clear,
+            ),
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks are run from the repository root, e.g.::
+
+    python -m benchmarks.thumbnails
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BASE_DIR, 'yatube')
+
+
+def setup():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_environment():
+    """Run inside a throwaway database, cache and media root."""
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from core.testing import temporary_cache
+    media_root = tempfile.mkdtemp()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(MEDIA_ROOT=media_root), temporary_cache():
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def measure(func, repeat=50, before=None):
+    """Return the wall time of ``repeat`` calls of ``func`` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(label, timings):
+    print(
+        f'{label:<45} '
+        f'median {statistics.median(timings) * 1000:8.2f} ms  '
+        f'p95 {percentile(timings, 0.95) * 1000:8.2f} ms'
+    )
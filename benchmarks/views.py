@@ -0,0 +1,206 @@
+"""Latency, query count and response size of every posts, users and API view.
+
+Runs against a dataset made by ``generate_data`` and compares the results
+with a stored baseline::
+
+    python -m benchmarks.views --save-baseline
+    python -m benchmarks.views            # exits with 1 on regressions
+
+A view regresses when it runs more queries than in the baseline, or when
+its median latency grows by more than --tolerance and --slack together;
+the median is used because the tail of a few dozen requests is too noisy
+to compare between runs. Views missing from the baseline fail as well, as
+does a run without one.
+
+Latencies depend on the machine, so the baseline committed to
+benchmarks/baselines only holds query counts, statuses and sizes; it was
+saved with the default options and ``--save-baseline --queries-only``.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from io import StringIO
+
+from benchmarks.utils import BASE_DIR, benchmark_environment, percentile, setup
+
+BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baselines', 'views.json')
+URL_MODULES = (('posts.urls', ''), ('users.urls', 'auth/'))
+# Views that would end the session or destroy the sample data.
+SKIP = {'posts:post_delete', 'posts:delete_comment', 'users:logout'}
+QUERY_STRINGS = {'posts:search': '?search=год'}
+PARAMETER = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=40000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument(
+        '--cold', action='store_true',
+        help='Clear the cache before every request.',
+    )
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument(
+        '--queries-only', action='store_true',
+        help='Leave latencies out of the saved baseline.',
+    )
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument(
+        '--slack', type=float, default=1.0,
+        help='Latency growth in ms always tolerated.',
+    )
+    return parser.parse_args()
+
+
+def sample_parameters(user):
+    """Values for the URL parameters, taken from the busiest author."""
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+    from posts.models import Comment, Group, Post
+
+    post = Post.objects.filter(author=user).first()
+    comment = Comment.objects.create(post=post, author=user, text='Тест')
+    group = Group.objects.order_by('-posts__pub_date').first()
+    return {
+        'post_id': post.pk,
+        'comment_id': comment.pk,
+        'username': user.username,
+        'slug': group.slug,
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+
+
+def collect_urls(parameters):
+    """Yield ``(name, url)`` for every view of URL_MODULES."""
+    from importlib import import_module
+
+    for module_name, prefix in URL_MODULES:
+        module = import_module(module_name)
+        namespace = getattr(module, 'app_name', '')
+        for pattern in module.urlpatterns:
+            route = str(pattern.pattern)
+            name = f'{namespace}:{pattern.name or route}'
+            if name in SKIP:
+                continue
+            path = PARAMETER.sub(
+                lambda match: str(parameters[match[1]]), route
+            )
+            yield name, f'/{prefix}{path}{QUERY_STRINGS.get(name, "")}'
+
+
+def run_view(client, url, repeat, cold):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings, queries = [], []
+    response = client.get(url)
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(captured))
+    return {
+        'status': response.status_code,
+        'p50': statistics.median(timings) * 1000,
+        'p95': percentile(timings, 0.95) * 1000,
+        'p99': percentile(timings, 0.99) * 1000,
+        'queries': max(queries),
+        'bytes': len(getattr(response, 'content', b'')),
+    }
+
+
+def regressions(name, result, baseline, tolerance, slack):
+    previous = baseline.get(name)
+    if previous is None:
+        return ['not in the baseline']
+    found = []
+    if 'p50' in previous and (
+        result['p50'] > previous['p50'] * (1 + tolerance) + slack
+    ):
+        found.append(f'p50 {previous["p50"]:.1f} -> {result["p50"]:.1f} ms')
+    if result['queries'] > previous['queries']:
+        found.append(
+            f'queries {previous["queries"]} -> {result["queries"]}'
+        )
+    return found
+
+
+def main():
+    options = parse_args()
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db.models import Count
+    from django.test import Client
+
+    baseline = {}
+    if not options.save_baseline:
+        if not os.path.exists(options.baseline):
+            sys.exit(
+                f'No baseline at {options.baseline}, '
+                'run with --save-baseline first.'
+            )
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+
+    results, failed = {}, False
+    with benchmark_environment():
+        call_command(
+            'generate_data',
+            users=options.users,
+            posts=options.posts,
+            comments=options.comments,
+            seed=options.seed,
+            stdout=StringIO(),
+        )
+        user = get_user_model().objects.annotate(
+            posts_count=Count('posts')
+        ).order_by('-posts_count').first()
+        client = Client()
+        client.force_login(user)
+        print(
+            f'{"view":<32} {"status":>6} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"queries":>7} {"bytes":>8}'
+        )
+        for name, url in collect_urls(sample_parameters(user)):
+            result = run_view(client, url, options.repeat, options.cold)
+            results[name] = result
+            problems = [] if options.save_baseline else regressions(
+                name, result, baseline, options.tolerance, options.slack
+            )
+            failed = failed or bool(problems)
+            print(
+                f'{name:<32} {result["status"]:>6} {result["p50"]:8.2f} '
+                f'{result["p95"]:8.2f} {result["p99"]:8.2f} '
+                f'{result["queries"]:>7} {result["bytes"]:>8}'
+                + (f'  REGRESSION: {", ".join(problems)}' if problems else '')
+            )
+
+    if options.save_baseline:
+        os.makedirs(os.path.dirname(options.baseline), exist_ok=True)
+        if options.queries_only:
+            for result in results.values():
+                for key in ('p50', 'p95', 'p99'):
+                    del result[key]
+        with open(options.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f'Baseline saved to {options.baseline}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
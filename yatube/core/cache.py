@@ -0,0 +1,465 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE TABLE IF NOT EXISTS generations (
+    generation INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    count INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO entries VALUES (0, (SELECT count(*) FROM cache));
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache
+BEGIN UPDATE entries SET count = count + 1; END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache
+BEGIN UPDATE entries SET count = count - 1; END;
+'''
+# Wildcard key written to the generation log by clear().
+ALL_KEYS = '*'
+# Number of parameters per IN (...) query, below SQLITE_MAX_VARIABLE_NUMBER.
+BATCH_SIZE = 500
+# Number of generations kept in the log. Processes that fall further behind
+# drop their whole in-process tier.
+GENERATIONS_KEPT = 10000
+# Number of writes between sweeps of expired entries and old generations.
+# Live entries are evicted as soon as there are more than MAX_ENTRIES.
+CULL_INTERVAL = 1000
+
+
+def chunked(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Cache shared by all processes on a host, stored in a SQLite file.
+
+    Every write is recorded in a ``generations`` log, which lets the
+    in-process tier of :class:`TieredCache` find out what other processes
+    have changed.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=10, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._cull()
+
+    def _expires(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else time.time() + timeout
+
+    def _log(self, connection, keys):
+        """Record writes to ``keys``, returning the last generation."""
+        connection.executemany(
+            'INSERT INTO generations (key) VALUES (?)',
+            ((key,) for key in keys),
+        )
+        return connection.execute(
+            'SELECT max(generation) FROM generations'
+        ).fetchone()[0]
+
+    def _count(self):
+        # Kept by triggers, so that no write has to count the whole table.
+        return self._connection.execute(
+            'SELECT count FROM entries'
+        ).fetchone()[0]
+
+    def _cull(self):
+        self._writes += 1
+        if (
+            self._writes % CULL_INTERVAL
+            and self._count() <= self._max_entries
+        ):
+            return
+        connection = self._connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        connection.execute(
+            'DELETE FROM generations WHERE generation <= '
+            '(SELECT max(generation) FROM generations) - ?',
+            (GENERATIONS_KEPT,),
+        )
+        count = self._count()
+        if count > self._max_entries:
+            # Entries that never expire are evicted last.
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires IS NULL, expires '
+                'LIMIT ?)',
+                (count // self._cull_frequency if self._cull_frequency
+                 else count,),
+            )
+
+    def _fetch(self, keys):
+        """Return ``{key: (pickled value, expires)}`` of live entries."""
+        found = {}
+        now = time.time()
+        for batch in chunked(keys):
+            rows = self._connection.execute(
+                'SELECT key, value, expires FROM cache WHERE key IN (%s) '
+                'AND (expires IS NULL OR expires > ?)'
+                % ', '.join('?' * len(batch)),
+                (*batch, now),
+            )
+            found.update(
+                (key, (value, expires)) for key, value, expires in rows
+            )
+        return found
+
+    def _store(self, items, expires, only_new=False):
+        """Write ``{key: pickled value}``, returning the keys written."""
+        with self._transaction() as connection:
+            if only_new:
+                existing = self._fetch(items)
+                items = {
+                    key: value for key, value in items.items()
+                    if key not in existing
+                }
+            connection.executemany(
+                # Not INSERT OR REPLACE: its implicit deletes would not
+                # reach the cache_delete trigger.
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires',
+                ((key, value, expires) for key, value in items.items()),
+            )
+            generation = self._log(connection, items)
+        return items, generation
+
+    def _remove(self, keys):
+        with self._transaction() as connection:
+            deleted = 0
+            for batch in chunked(keys):
+                deleted += connection.execute(
+                    'DELETE FROM cache WHERE key IN (%s)'
+                    % ', '.join('?' * len(batch)),
+                    batch,
+                ).rowcount
+            self._log(connection, keys)
+        return deleted
+
+    def _prepare(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare(key, version)
+        written, _ = self._store(
+            {key: pickle.dumps(value, pickle.HIGHEST_PROTOCOL)},
+            self._expires(timeout),
+            only_new=True,
+        )
+        return bool(written)
+
+    def get(self, key, default=None, version=None):
+        key = self._prepare(key, version)
+        found = self._fetch([key])
+        if key not in found:
+            return default
+        return pickle.loads(found[key][0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare(key, version)
+        self._store(
+            {key: pickle.dumps(value, pickle.HIGHEST_PROTOCOL)},
+            self._expires(timeout),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare(key, version)
+        with self._transaction() as connection:
+            updated = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self._expires(timeout), key, time.time()),
+            ).rowcount
+            self._log(connection, [key])
+        return bool(updated)
+
+    def delete(self, key, version=None):
+        self._remove([self._prepare(key, version)])
+
+    def get_many(self, keys, version=None):
+        made_keys = {self._prepare(key, version): key for key in keys}
+        found = self._fetch(made_keys)
+        return {
+            made_keys[key]: pickle.loads(value)
+            for key, (value, expires) in found.items()
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(
+            {
+                self._prepare(key, version):
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                for key, value in data.items()
+            },
+            self._expires(timeout),
+        )
+        return []
+
+    def delete_many(self, keys, version=None):
+        self._remove([self._prepare(key, version) for key in keys])
+
+    def has_key(self, key, version=None):
+        return bool(self._fetch([self._prepare(key, version)]))
+
+    def incr(self, key, delta=1, version=None):
+        """Atomically add ``delta`` to an existing value."""
+        key = self._prepare(key, version)
+        with self._transaction() as connection:
+            found = self._fetch([key])
+            if key not in found:
+                raise ValueError("Key '%s' not found" % key)
+            value, expires = found[key]
+            value = pickle.loads(value) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+            self._log(connection, [key])
+        return value
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache')
+            self._log(connection, [ALL_KEYS])
+
+
+class LRUStore:
+    """Size-bounded, thread-safe LRU of pickled values.
+
+    Every entry remembers the generation it was known to be fresh at, so
+    that a newer write logged by another process evicts it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = None
+        self.synced = 0.0
+        self.stats = dict.fromkeys(
+            ('l1_hits', 'l1_misses', 'l2_hits', 'l2_misses'), 0
+        )
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires, generation = entry
+            if expires is not None and expires <= time.time():
+                self._pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, expires, generation):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (value, expires, generation)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self.entries)))
+
+    def evict(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] < generation:
+                self._pop(key)
+
+    def discard(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class TieredCache(SQLiteCache):
+    """In-process LRU in front of the shared :class:`SQLiteCache`.
+
+    The LRU is shared by all threads of a process and bounded by
+    ``OPTIONS['MAX_BYTES']``. At most every ``OPTIONS['SYNC_INTERVAL']``
+    seconds a process reads the generations logged since its last check and
+    evicts the entries other processes have changed, so a write is visible
+    everywhere within that interval.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        options = params.get('OPTIONS', {})
+        self._sync_interval = float(options.get('SYNC_INTERVAL', 1.0))
+        with _stores_lock:
+            self._l1 = _stores.setdefault(
+                location,
+                LRUStore(int(options.get('MAX_BYTES', 16 * 1024 * 1024))),
+            )
+
+    def _sync(self):
+        store = self._l1
+        now = time.monotonic()
+        if now - store.synced < self._sync_interval:
+            return
+        store.synced = now
+        connection = self._connection
+        oldest, newest = connection.execute(
+            'SELECT min(generation), max(generation) FROM generations'
+        ).fetchone()
+        newest = newest or 0
+        if store.generation is None or (
+            oldest is not None and oldest > store.generation + 1
+        ):
+            store.clear()
+        else:
+            rows = connection.execute(
+                'SELECT generation, key FROM generations '
+                'WHERE generation > ? AND generation <= ?',
+                (store.generation, newest),
+            )
+            for generation, key in rows:
+                if key == ALL_KEYS:
+                    store.clear()
+                else:
+                    store.evict(key, generation)
+        store.generation = newest
+
+    def _lookup(self, keys):
+        """Return ``{key: pickled value}``, filling the LRU from SQLite."""
+        self._sync()
+        store = self._l1
+        found = {}
+        for key in keys:
+            value = store.get(key)
+            if value is not None:
+                found[key] = value
+        missing = [key for key in keys if key not in found]
+        store.stats['l1_hits'] += len(found)
+        store.stats['l1_misses'] += len(missing)
+        if settings.METRICS_ENABLED:
+            metrics.record_cache_lookups(keys, found, 'memory')
+        if missing:
+            # Read before fetching: a write logged while fetching must
+            # still evict what was fetched.
+            generation = store.generation or 0
+            fetched = self._fetch(missing)
+            store.stats['l2_hits'] += len(fetched)
+            store.stats['l2_misses'] += len(missing) - len(fetched)
+            if settings.METRICS_ENABLED:
+                metrics.record_cache_lookups(missing, fetched, 'sqlite')
+            for key, (value, expires) in fetched.items():
+                store.put(key, value, expires, generation)
+                found[key] = value
+        return found
+
+    def _store(self, items, expires, only_new=False):
+        items, generation = super()._store(items, expires, only_new)
+        for key, value in items.items():
+            self._l1.put(key, value, expires, generation)
+        return items, generation
+
+    def _remove(self, keys):
+        for key in keys:
+            self._l1.discard(key)
+        return super()._remove(keys)
+
+    def get(self, key, default=None, version=None):
+        key = self._prepare(key, version)
+        found = self._lookup([key])
+        if key not in found:
+            return default
+        return pickle.loads(found[key])
+
+    def get_many(self, keys, version=None):
+        made_keys = {self._prepare(key, version): key for key in keys}
+        return {
+            made_keys[key]: pickle.loads(value)
+            for key, value in self._lookup(list(made_keys)).items()
+        }
+
+    def has_key(self, key, version=None):
+        return bool(self._lookup([self._prepare(key, version)]))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1.discard(self._prepare(key, version))
+        return super().touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1.discard(self._prepare(key, version))
+        return super().incr(key, delta, version)
+
+    def clear(self):
+        self._l1.clear()
+        super().clear()
+
+    def stats(self):
+        """Hit ratios of both tiers for this process."""
+        store = self._l1
+        stats = dict(store.stats, l1_bytes=store.size,
+                     l1_entries=len(store.entries))
+        for tier in ('l1', 'l2'):
+            lookups = stats[f'{tier}_hits'] + stats[f'{tier}_misses']
+            stats[f'{tier}_hit_ratio'] = (
+                stats[f'{tier}_hits'] / lookups if lookups else 0.0
+            )
+        return stats
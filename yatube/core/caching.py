@@ -0,0 +1,70 @@
+import math
+import random
+import time
+
+from django.core.cache import cache as default_cache
+
+# How long past its expiry a value may still be served while one request
+# recomputes it, as a multiple of its timeout.
+STALE_FACTOR = 5
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def is_fresh(expiry, delta, beta):
+    """Decide whether to keep a value or refresh it early (XFetch).
+
+    The closer the value is to its expiry and the longer it took to
+    compute, the likelier a request volunteers to recompute it.
+    """
+    return time.time() - delta * beta * math.log(random.random()) < expiry
+
+
+def recompute(cache, key, compute, timeout):
+    start = time.time()
+    value = compute()
+    delta = time.time() - start
+    cache.set(
+        key,
+        (value, delta, time.time() + timeout),
+        timeout * (STALE_FACTOR + 1),
+    )
+    return value
+
+
+def get_or_compute(key, compute, timeout, cache=None, beta=1.0):
+    """Return the cached value of ``key``, computing it at most once.
+
+    Values are refreshed shortly before they expire by a single request
+    holding a lock; concurrent requests keep getting the stale value in the
+    meantime. When there is nothing cached at all, they wait for the lock
+    holder instead of running ``compute`` themselves.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        if is_fresh(expiry, delta, beta):
+            return value
+        if not cache.add(lock_key(key), True, LOCK_TIMEOUT):
+            return value
+        try:
+            return recompute(cache, key, compute, timeout)
+        finally:
+            cache.delete(lock_key(key))
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key(key), True, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    try:
+        return recompute(cache, key, compute, timeout)
+    finally:
+        cache.delete(lock_key(key))
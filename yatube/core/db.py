@@ -0,0 +1,18 @@
+import re
+
+from django.conf import settings
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            if value is None:
+                continue
+            if not PRAGMA_NAME.match(name):
+                raise ValueError(f'Invalid SQLite pragma: {name!r}')
+            cursor.execute(f'PRAGMA {name} = {value}')
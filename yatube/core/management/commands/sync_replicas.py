@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from core.models import ReplicationHeartbeat
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database to the replica files. Run it '
+        'periodically, more often than REPLICA_MAX_LAG.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite replicas can be synced.')
+        ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            pk=1, defaults={'updated': timezone.now()}
+        )
+        primary.ensure_connection()
+        for alias in settings.REPLICA_DATABASES:
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'Synced {alias}')
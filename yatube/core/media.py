@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpRequest, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+CHUNK_SIZE = 64 * 1024
+HASHED_NAME = re.compile(r'[0-9a-f]{32,}(@\d+x)?\.\w+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=3600'
+
+
+class MediaFileResponse(FileResponse):
+    block_size = CHUNK_SIZE
+
+
+def iter_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` of a single byte range, inclusive.
+
+    ``None`` means the header should be ignored and the whole file sent,
+    ``ValueError`` that the range cannot be satisfied.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def get_etag(stat):
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def is_not_modified(request, stat, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match == etag
+    return not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime,
+        stat.st_size,
+    )
+
+
+def offload(response, path, fullpath):
+    # Percent-encoded, as non-ASCII header values would be MIME-encoded.
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header == 'X-Accel-Redirect':
+        response[header] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+    else:
+        response[header] = quote(fullpath)
+    return response
+
+
+def file_response(request, fullpath, size, etag):
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if header is not None and if_range in (None, etag):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        response = MediaFileResponse(open(fullpath, 'rb'))
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            iter_range(open(fullpath, 'rb'), start, length), status=206
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request: HttpRequest, path: str) -> HttpResponse:
+    """Serve a file from MEDIA_ROOT.
+
+    Supports conditional GET, single byte ranges and far-future caching of
+    content-addressed names. With MEDIA_SENDFILE_HEADER set, the transfer is
+    handed over to the front server instead.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+    etag = get_etag(stat)
+    if is_not_modified(request, stat, etag):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_SENDFILE_HEADER:
+        response = offload(HttpResponse(), path, fullpath)
+    else:
+        response = file_response(request, fullpath, stat.st_size, etag)
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    if response.status_code != 304:
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    if response.status_code != 416:
+        response['Cache-Control'] = (
+            IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+        )
+    return response
@@ -0,0 +1,250 @@
+"""Application metrics in the Prometheus text exposition format.
+
+Every process counts into an in-memory :class:`Registry`, and a background
+thread adds its counts to a SQLite file shared by all processes on the
+host every METRICS_FLUSH_INTERVAL seconds, so ``/metrics`` reports totals
+across the workers no matter which one serves the scrape. Histograms are
+stored as their cumulative ``_bucket``, ``_sum`` and ``_count`` counters.
+"""
+import atexit
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+);
+'''
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf')
+)
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Requests by URL name, method and status.'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Request latency by URL name.'
+    ),
+    'yatube_db_queries_total': ('counter', 'SQL queries by URL name.'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Time spent in SQL queries by URL name.'
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Cache lookups by key namespace, tier and result.'
+    ),
+    'yatube_thumbnails_generated_total': (
+        'counter', 'Thumbnails generated.'
+    ),
+}
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+UNRESOLVED = '<unresolved>'
+NAMESPACE_SEPARATOR = re.compile(r'[:|.]')
+BUCKET_BOUND = re.compile(r'(?:^|,)le="([^"]+)"')
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_labels(labels):
+    return ','.join(
+        f'{name}="{escape(value)}"' for name, value in sorted(labels.items())
+    )
+
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Registry:
+    """Counters of this process not yet added to the shared store."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(float)
+        self.store_lock = threading.Lock()
+        self.connection = None
+        self.path = None
+        self.pid = None
+
+    def start(self):
+        """Start the flushing thread, again in a forked worker."""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            # A connection inherited from the parent must not be used.
+            self.connection = None
+        threading.Thread(
+            target=self.run, name='metrics-flush', daemon=True
+        ).start()
+
+    def run(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def inc(self, name, value=1, **labels):
+        self.start()
+        key = (name, format_labels(labels))
+        with self.lock:
+            self.pending[key] += value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        updates = [
+            (
+                f'{name}_bucket',
+                format_labels({**labels, 'le': format_bound(bound)}),
+                1,
+            )
+            for bound in buckets if value <= bound
+        ]
+        plain = format_labels(labels)
+        updates.append((f'{name}_sum', plain, value))
+        updates.append((f'{name}_count', plain, 1))
+        self.start()
+        with self.lock:
+            for sample, label_string, amount in updates:
+                self.pending[(sample, label_string)] += amount
+
+    def execute(self, sql, rows=None):
+        """Run ``sql`` on the shared store, connecting on first use."""
+        with self.store_lock:
+            path = settings.METRICS_DATABASE
+            if self.connection is None or self.path != path:
+                self.connection, self.path = connect(path), path
+            with self.connection:
+                if rows is None:
+                    return self.connection.execute(sql).fetchall()
+                self.connection.executemany(sql, rows)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(float)
+        if not pending:
+            return
+        try:
+            self.execute(
+                'INSERT INTO samples (name, labels, value) '
+                'VALUES (?, ?, ?) ON CONFLICT (name, labels) '
+                'DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value)
+                 for (name, labels), value in pending.items()],
+            )
+        except sqlite3.Error:
+            # Metrics must never fail the process; these counts are lost.
+            logger.warning('Could not store metrics', exc_info=True)
+
+
+def connect(path):
+    # Shared by the flushing thread and the thread serving /metrics,
+    # under Registry.store_lock.
+    connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Responses served by middleware, e.g. from the page cache.
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return UNRESOLVED
+    return match.view_name
+
+
+def record_request(request, response, profile):
+    """Count a request profiled by ``core.profiling``."""
+    view = url_name(request)
+    registry.inc(
+        'yatube_requests_total',
+        view=view, method=request.method, status=response.status_code,
+    )
+    registry.observe(
+        'yatube_request_duration_seconds', profile.times['total'], view=view
+    )
+    registry.inc(
+        'yatube_db_queries_total', profile.query_count, view=view
+    )
+    registry.inc(
+        'yatube_db_query_seconds_total', profile.times['db'], view=view
+    )
+
+
+def record_cache_lookups(keys, found, tier):
+    """Count hits and misses of cache ``keys`` per key namespace."""
+    counts = defaultdict(int)
+    for key in keys:
+        # Drop the KEY_PREFIX and version added by make_key().
+        name = NAMESPACE_SEPARATOR.split(key.split(':', 2)[-1], 1)[0]
+        counts[(name, 'hit' if key in found else 'miss')] += 1
+    for (name, result), count in counts.items():
+        registry.inc(
+            'yatube_cache_requests_total', count,
+            cache=name, tier=tier, result=result,
+        )
+
+
+def family(sample):
+    if sample in METRICS:
+        return sample
+    for suffix in HISTOGRAM_SUFFIXES:
+        name = sample[:-len(suffix)]
+        if sample.endswith(suffix) and name in METRICS:
+            return name
+    return None
+
+
+def sort_key(sample):
+    """Order samples by name and labels, buckets by their bound."""
+    name, labels, _ = sample
+    match = BUCKET_BOUND.search(labels)
+    if match is None:
+        return name, labels, 0.0
+    return name, BUCKET_BOUND.sub('', labels), float(match[1])
+
+
+def render():
+    """Return the totals of all processes in the text exposition format."""
+    registry.flush()
+    rows = registry.execute('SELECT name, labels, value FROM samples')
+    samples = defaultdict(list)
+    for name, labels, value in sorted(rows, key=sort_key):
+        samples[family(name)].append((name, labels, value))
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for sample, labels, value in samples[name]:
+            labels = f'{{{labels}}}' if labels else ''
+            lines.append(f'{sample}{labels} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
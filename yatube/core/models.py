@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class ReplicationHeartbeat(models.Model):
+    """A single row rewritten on the primary and copied to the replicas.
+
+    The age of the copy on a replica tells how far behind it is.
+    """
+    updated = models.DateTimeField(verbose_name='Время отметки')
+
+    class Meta:
+        verbose_name = 'Отметка репликации'
+        verbose_name_plural = 'Отметки репликации'
+
+    def __str__(self) -> str:
+        return self.updated.isoformat()
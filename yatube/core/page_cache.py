@@ -0,0 +1,167 @@
+import hashlib
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.deprecation import MiddlewareMixin
+
+CACHEABLE_METHODS = ('GET', 'HEAD')
+HOLE = re.compile(
+    r'<!--hole:(?P<name>[\w./-]+)-->(?P<content>.*?)<!--/hole-->', re.S
+)
+
+
+def tag_key(tag):
+    return f'page_tag:{tag}'
+
+
+def page_key(request, prefix='page'):
+    path = f'{request.get_host()}{request.get_full_path()}'
+    return f'{prefix}:' + hashlib.md5(path.encode()).hexdigest()
+
+
+def shared_page_key(request):
+    return page_key(request, prefix='page:shared')
+
+
+def current_tokens(tags):
+    """Return the current token of every tag, creating missing ones."""
+    keys = [tag_key(tag) for tag in tags]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            token = uuid.uuid4().hex
+            cache.add(key, token, None)
+            tokens[key] = cache.get(key, token)
+    return tokens
+
+
+def add_cache_tags(request, *tags, holes=False):
+    """Mark the response to ``request`` as cacheable, depending on ``tags``.
+
+    Call it before reading the data the page is built from, so that a purge
+    racing with the view makes the cached copy stale rather than lost.
+    With ``holes=True`` the page is cached for authenticated users too: its
+    only user-specific parts are ``{% hole %}`` fragments, rendered for each
+    request and spliced into the shared body.
+    """
+    if not hasattr(request, 'cache_tags'):
+        request.cache_tags = {}
+    request.cache_tags.update(current_tokens(tags))
+    request.cache_holes = holes and settings.PAGE_CACHE_AUTHENTICATED
+
+
+def purge_tags(*tags):
+    """Invalidate every cached page depending on any of ``tags``."""
+    cache.set_many(
+        {tag_key(tag): uuid.uuid4().hex for tag in tags}, None
+    )
+
+
+def punch_holes(content):
+    return HOLE.sub(r'<!--hole:\g<name>--><!--/hole-->', content)
+
+
+def fill_holes(content, request):
+    return HOLE.sub(
+        lambda match: render_to_string(match['name'], request=request),
+        content,
+    )
+
+
+def strip_holes(content):
+    return HOLE.sub(r'\g<content>', content)
+
+
+def tokens_valid(tokens):
+    return cache.get_many(tokens) == tokens
+
+
+def is_anonymous(request):
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    return not request.user.is_authenticated
+
+
+class AnonymousPageCacheMiddleware(MiddlewareMixin):
+    """Cache whole pages for anonymous users.
+
+    Only responses of views that called :func:`add_cache_tags` are stored,
+    together with the tokens of their tags; a page is served from cache as
+    long as none of its tags has been purged since. Authenticated users,
+    pages that issued a CSRF token and responses setting cookies bypass the
+    cache, except for pages with holes: their body is shared by all
+    authenticated users and only the holes are rendered per request.
+    """
+
+    def process_request(self, request):
+        if request.method not in CACHEABLE_METHODS:
+            return None
+        if not is_anonymous(request):
+            return None
+        entry = cache.get(page_key(request))
+        if entry is None:
+            return None
+        if not tokens_valid(entry['tags']):
+            return None
+        return self.cached_response(entry, entry['content'])
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Serve shared page bodies to authenticated users.
+
+        Runs after URL resolution, so holes can use ``resolver_match``.
+        """
+        if (
+            not settings.PAGE_CACHE_AUTHENTICATED
+            or request.method not in CACHEABLE_METHODS
+            or is_anonymous(request)
+        ):
+            return None
+        entry = cache.get(shared_page_key(request))
+        if entry is None or not tokens_valid(entry['tags']):
+            return None
+        content = entry['content'].decode(settings.DEFAULT_CHARSET)
+        return self.cached_response(entry, fill_holes(content, request))
+
+    def cached_response(self, entry, content):
+        response = HttpResponse(content)
+        for header, value in entry['headers']:
+            response[header] = value
+        return response
+
+    def is_cacheable(self, request, response):
+        return (
+            getattr(request, 'cache_tags', None)
+            and request.method in CACHEABLE_METHODS
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+
+    def process_response(self, request, response):
+        if getattr(request, 'cache_holes', False) and not response.streaming:
+            content = response.content.decode(settings.DEFAULT_CHARSET)
+            if self.is_cacheable(request, response) and not is_anonymous(
+                request
+            ):
+                self.store(shared_page_key(request), request, response,
+                           punch_holes(content).encode())
+            response.content = strip_holes(content)
+        if self.is_cacheable(request, response) and is_anonymous(request):
+            self.store(page_key(request), request, response, response.content)
+        return response
+
+    def store(self, key, request, response, content):
+        cache.set(
+            key,
+            {
+                'tags': request.cache_tags,
+                'content': content,
+                'headers': list(response.items()),
+            },
+            settings.PAGE_CACHE_TIMEOUT,
+        )
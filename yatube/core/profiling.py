@@ -0,0 +1,206 @@
+"""Per-request breakdown of where the time goes.
+
+:class:`ProfilingMiddleware` times every request and splits the time into
+SQL, template rendering, thumbnail generation and the remaining Python
+code. SQL is measured by execute wrappers on every database connection,
+templates by :class:`DjangoTemplates` and thumbnails by the sorl backend in
+``posts.thumbnails``; all of them report to :func:`timer`. Times are
+exclusive: queries run while a template renders count as SQL only.
+
+Execute wrappers only see the connections of the thread serving the
+request: queries run by other threads on its behalf are neither counted
+nor timed as SQL.
+
+The breakdown is sent in a ``Server-Timing`` header, which browser dev
+tools display next to the request, and requests slower than
+SLOW_REQUEST_THRESHOLD milliseconds are logged with their top queries.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates as BaseTemplates
+from django.template.backends.django import Template as BaseTemplate
+from django.template.backends.django import reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    ('db', 'SQL'),
+    ('template', 'Templates'),
+    ('thumbnail', 'Thumbnails'),
+    ('python', 'Python'),
+    ('total', 'Total'),
+)
+
+_local = threading.local()
+
+
+class Profile:
+    def __init__(self, keep_queries=False):
+        self.start = time.perf_counter()
+        self.times = defaultdict(float)
+        self.query_count = 0
+        self.queries = defaultdict(lambda: [0, 0.0]) if keep_queries else None
+        self.stack = []
+
+    def enter(self):
+        self.stack.append(0.0)
+
+    def exit(self, name, elapsed):
+        # Time of nested timers was already booked under their own names.
+        self.times[name] += elapsed - self.stack.pop()
+        if self.stack:
+            self.stack[-1] += elapsed
+
+    def add_query(self, sql, elapsed):
+        self.query_count += 1
+        if self.queries is not None:
+            entry = self.queries[sql]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def top_queries(self, count):
+        return sorted(
+            self.queries.items(), key=lambda item: item[1][1], reverse=True
+        )[:count]
+
+    def finish(self):
+        self.times['total'] = time.perf_counter() - self.start
+        self.times['python'] = max(
+            self.times['total'] - sum(
+                elapsed for name, elapsed in self.times.items()
+                if name not in ('total', 'python')
+            ),
+            0.0,
+        )
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def timer(name):
+    """Book the time spent in the block under ``name`` in the profile."""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+    profile.enter()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.exit(name, time.perf_counter() - start)
+
+
+def query_timer(execute, sql, params, many, context):
+    profile = current_profile()
+    if profile is None:
+        return execute(sql, params, many, context)
+    with timer('db'):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            profile.add_query(sql, time.perf_counter() - start)
+
+
+def server_timing(profile):
+    entries = []
+    for name, description in METRICS:
+        if name == 'db':
+            description = f'{description} ({profile.query_count} queries)'
+        entries.append(
+            f'{name};dur={profile.times[name] * 1000:.1f};'
+            f'desc="{description}"'
+        )
+    return ', '.join(entries)
+
+
+class ProfilingMiddleware:
+    """Measure SQL, template, thumbnail and Python time of every request.
+
+    Placed first in MIDDLEWARE, so that the other middleware is measured
+    too. Enabled by SERVER_TIMING, SLOW_REQUEST_THRESHOLD or
+    METRICS_ENABLED, which feeds the profiles to ``core.metrics``.
+    """
+
+    def __init__(self, get_response):
+        if not (
+            settings.SERVER_TIMING
+            or settings.SLOW_REQUEST_THRESHOLD
+            or settings.METRICS_ENABLED
+        ):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = Profile(
+            keep_queries=bool(settings.SLOW_REQUEST_THRESHOLD)
+        )
+        _local.profile = profile
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(query_timer)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        profile.finish()
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = server_timing(profile)
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if threshold and profile.times['total'] * 1000 >= threshold:
+            self.log_slow_request(request, profile)
+        if settings.METRICS_ENABLED:
+            metrics.record_request(request, response, profile)
+        return response
+
+    def log_slow_request(self, request, profile):
+        lines = [
+            f'{count} x {elapsed * 1000:.1f} ms: {sql}'
+            for sql, (count, elapsed) in profile.top_queries(
+                settings.SLOW_REQUEST_TOP_QUERIES
+            )
+        ]
+        logger.warning(
+            'Slow request %s %s: %s\n%s',
+            request.method,
+            request.get_full_path(),
+            ', '.join(
+                f'{name} {profile.times[name] * 1000:.1f} ms'
+                for name, _ in METRICS
+            ),
+            '\n'.join(lines),
+        )
+
+
+class Template(BaseTemplate):
+    def render(self, context=None, request=None):
+        with timer('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseTemplates):
+    """Django template backend whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,139 @@
+"""Send reads to replicas and writes to the primary database.
+
+A session that has just written keeps reading from the primary for
+READ_YOUR_WRITES_WINDOW seconds, so it sees its own changes. Replicas whose
+heartbeat is older than REPLICA_MAX_LAG seconds are skipped.
+
+Writes also purge page cache tags and bump versions, and whatever is read
+next gets cached under the new keys for minutes: pages, post cards and
+identity lookups. Read from a replica that has not caught up yet, that
+would be the old data. So after any write, by any session or process, all
+reads go to the primary for REPLICA_MAX_LAG seconds; the time of the last
+write is kept in the shared cache.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'primary_db'
+LAST_WRITE_KEY = 'routers:last_write'
+# Seconds between two notes of writes outside of requests, e.g. commands.
+WRITE_NOTE_INTERVAL = 1
+
+_state = threading.local()
+_freshness = {}
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False) or getattr(
+        _state, 'written', False
+    )
+
+
+def note_write():
+    """Record the time of a write, once per request or WRITE_NOTE_INTERVAL."""
+    now = time.monotonic()
+    noted = getattr(_state, 'noted', None)
+    if noted is not None and now - noted < WRITE_NOTE_INTERVAL:
+        return
+    _state.noted = now
+    cache.set(LAST_WRITE_KEY, time.time(), None)
+
+
+def written_recently():
+    last_write = cache.get(LAST_WRITE_KEY)
+    return last_write is not None and (
+        time.time() - last_write
+        <= settings.REPLICA_MAX_LAG + WRITE_NOTE_INTERVAL
+    )
+
+
+def is_fresh(alias):
+    """Whether the heartbeat of replica ``alias`` is recent enough.
+
+    The answer is kept for REPLICA_CHECK_INTERVAL seconds per process.
+    """
+    checked, fresh = _freshness.get(alias, (None, False))
+    now = time.monotonic()
+    if checked is not None and now - checked < settings.REPLICA_CHECK_INTERVAL:
+        return fresh
+    from .models import ReplicationHeartbeat
+    try:
+        updated = ReplicationHeartbeat.objects.using(alias).values_list(
+            'updated', flat=True
+        ).first()
+    except DatabaseError:
+        logger.warning('Replica %s is unavailable', alias, exc_info=True)
+        updated = None
+    max_lag = timedelta(seconds=settings.REPLICA_MAX_LAG)
+    fresh = updated is not None and timezone.now() - updated <= max_lag
+    if not fresh and _freshness.get(alias, (None, True))[1]:
+        logger.warning('Replica %s is stale, reading from primary', alias)
+    _freshness[alias] = (now, fresh)
+    return fresh
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if (
+            not settings.REPLICA_DATABASES
+            or is_pinned()
+            or written_recently()
+        ):
+            return DEFAULT_DB_ALIAS
+        replicas = [
+            alias for alias in settings.REPLICA_DATABASES if is_fresh(alias)
+        ]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.written = True
+        if settings.REPLICA_DATABASES:
+            note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReadYourWritesMiddleware(MiddlewareMixin):
+    """Pin sessions that have just written to the primary database."""
+
+    def process_request(self, request):
+        _state.written = False
+        _state.noted = None
+        _state.pinned = request.get_signed_cookie(
+            PIN_COOKIE,
+            default=None,
+            max_age=settings.READ_YOUR_WRITES_WINDOW,
+        ) is not None
+
+    def process_response(self, request, response):
+        if getattr(_state, 'written', False):
+            response.set_signed_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.READ_YOUR_WRITES_WINDOW,
+                httponly=True,
+                samesite='Lax',
+            )
+        _state.written = _state.pinned = False
+        return response
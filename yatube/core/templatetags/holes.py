@@ -0,0 +1,33 @@
+from django import template
+from django.template.loader_tags import IncludeNode
+
+register = template.Library()
+
+
+class HoleNode(IncludeNode):
+    def render(self, context):
+        content = super().render(context)
+        request = context.get('request')
+        if not getattr(request, 'cache_holes', False):
+            return content
+        name = self.template.resolve(context)
+        return f'<!--hole:{name}-->{content}<!--/hole-->'
+
+
+@register.tag
+def hole(parser, token):
+    """Include a user-specific template that page caching must punch out.
+
+    Usage::
+
+        {% hole "includes/header.html" %}
+
+    The fragment is rendered with the request context only, so it must not
+    depend on variables passed by the view.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            '%r tag takes one argument: the template to include.' % bits[0]
+        )
+    return HoleNode(parser.compile_filter(bits[1]))
@@ -0,0 +1,52 @@
+from django import template
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from ..caching import get_or_compute
+
+register = template.Library()
+
+
+class SafeCacheNode(CacheNode):
+    def render(self, context):
+        timeout = int(self.expire_time_var.resolve(context))
+        cache_name = (
+            self.cache_name.resolve(context) if self.cache_name else 'default'
+        )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            timeout,
+            cache=caches[cache_name],
+        )
+
+
+@register.tag('safe_cache')
+def do_safe_cache(parser, token):
+    """Like ``{% cache %}``, but protected from cache stampedes.
+
+    Usage::
+
+        {% safe_cache [timeout] [fragment_name] [var1] .. [using="name"] %}
+            ..
+        {% endsafe_cache %}
+    """
+    nodelist = parser.parse(('endsafe_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            '%r tag requires at least 2 arguments.' % tokens[0]
+        )
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens.pop()[len('using='):])
+    return SafeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        cache_name,
+    )
@@ -0,0 +1,17 @@
+from django import template
+
+from core.versions import format_versions, get_versions
+
+register = template.Library()
+
+
+@register.simple_tag
+def versions(*targets):
+    """Join the versions of objects and models into one cache key part.
+
+    Usage::
+
+        {% versions post post.author as version %}
+        {% cache 600 post_detail post.pk version %}...{% endcache %}
+    """
+    return format_versions(get_versions(*targets))
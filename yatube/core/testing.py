@@ -0,0 +1,45 @@
+"""Keep test and benchmark runs away from the shared cache.
+
+The default cache lives in a file shared by every process of the site, so
+a test calling ``cache.clear()`` would wipe the live cache and entries
+would leak from one run into the next. :func:`temporary_cache` points
+every cache at a throwaway location instead; ``manage.py test`` applies it
+through :class:`TestRunner`, pytest through ``tests/conftest.py`` and the
+benchmarks through ``benchmarks.utils.benchmark_environment``.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def temporary_cache():
+    directory = tempfile.mkdtemp()
+    caches = {
+        alias: {
+            **params,
+            'LOCATION': os.path.join(directory, f'{alias}.sqlite3'),
+        }
+        for alias, params in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._temporary_cache = temporary_cache()
+        self._temporary_cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._temporary_cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
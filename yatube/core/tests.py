@@ -1,7 +1,31 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from unittest import mock
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.http import HttpResponse
-from django.test import TestCase
+from django.template import engines
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from . import metrics
+from .cache import LRUStore, TieredCache
+from .caching import get_or_compute, lock_key
+from .precompile import precompile_templates
+from .profiling import Profile, timer
+from .routers import (LAST_WRITE_KEY, PIN_COOKIE, ReadYourWritesMiddleware,
+                      ReplicaRouter)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+HASHED_NAME = 'cache/ab/cd/abcdef0123456789abcdef0123456789.jpg'
+PLAIN_NAME = 'files/отчёт 1.txt'
 
 
 class ViewTestClass(TestCase):
@@ -10,3 +34,387 @@ class ViewTestClass(TestCase):
         response: HttpResponse = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        for name in (HASHED_NAME, PLAIN_NAME):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as file:
+                file.write(bytes(range(100)))
+        cls.url = settings.MEDIA_URL + HASHED_NAME
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_file(self) -> None:
+        """Hashed media names are served with far-future caching."""
+        response: HttpResponse = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(100)))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_range(self) -> None:
+        """A single byte range is answered with 206."""
+        response: HttpResponse = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content),
+                         bytes(range(10, 20)))
+        response = self.client.get(self.url, HTTP_RANGE='bytes=200-')
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertNotIn('Cache-Control', response)
+
+    def test_conditional_get(self) -> None:
+        """Matching validators are answered with 304."""
+        response: HttpResponse = self.client.get(self.url)
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                self.assertEqual(
+                    self.client.get(self.url, **headers).status_code,
+                    HTTPStatus.NOT_MODIFIED
+                )
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self) -> None:
+        """With offloading enabled the body is left to the front server."""
+        response: HttpResponse = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/' + HASHED_NAME
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_accel_redirect_non_ascii(self) -> None:
+        """Offloaded non-ASCII names are percent-encoded."""
+        response: HttpResponse = self.client.get(
+            settings.MEDIA_URL + PLAIN_NAME
+        )
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/files/%D0%BE%D1%82%D1%87%D1%91%D1%82%201.txt'
+        )
+
+    def test_outside_media_root(self) -> None:
+        """Paths escaping MEDIA_ROOT are not found."""
+        response: HttpResponse = self.client.get(
+            settings.MEDIA_URL + '../manage.py'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.directory: str = tempfile.mkdtemp()
+        location: str = os.path.join(self.directory, 'cache.sqlite3')
+        params: dict = {'OPTIONS': {'SYNC_INTERVAL': 0, 'MAX_BYTES': 1024}}
+        self.cache: TieredCache = TieredCache(location, params)
+        self.other_process: TieredCache = TieredCache(location, params)
+        self.other_process._l1 = LRUStore(1024)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_second_tier_is_shared(self) -> None:
+        """Values written by one process are read from the shared tier."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.other_process.get('key'), 'value')
+        self.assertEqual(self.other_process.get('key'), 'value')
+        stats: dict = self.other_process.stats()
+        self.assertEqual(stats['l2_hits'], 1)
+        self.assertEqual(stats['l1_hits'], 1)
+
+    def test_writes_invalidate_other_processes(self) -> None:
+        """Writes and deletes evict stale first-tier copies elsewhere."""
+        self.cache.set('key', 'old')
+        self.other_process.get('key')
+        self.cache.set('key', 'new')
+        self.assertEqual(self.other_process.get('key'), 'new')
+        self.cache.delete('key')
+        self.assertIsNone(self.other_process.get('key'))
+        self.cache.set_many({'first': 1, 'second': 2})
+        self.other_process.get_many(['first', 'second'])
+        self.cache.clear()
+        self.assertEqual(self.other_process.get_many(['first', 'second']),
+                         {})
+
+    def test_first_tier_is_bounded_by_bytes(self) -> None:
+        """Least recently used entries leave the first tier first."""
+        for number in range(4):
+            self.cache.set(number, b'x' * 300)
+        self.assertLessEqual(self.cache.stats()['l1_bytes'], 1024)
+        self.assertIsNone(self.cache._l1.get(self.cache.make_key(0)))
+        self.assertEqual(self.cache.get(0), b'x' * 300)
+
+    def test_incr_and_add(self) -> None:
+        """incr is atomic across tiers, add keeps existing values."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.other_process.add('counter', 5))
+        self.other_process.get('counter')
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.other_process.get('counter'), 2)
+
+    def test_cull_evicts_expiring_entries_first(self) -> None:
+        """Past MAX_ENTRIES entries that never expire are evicted last."""
+        self.cache._max_entries = 4
+        self.cache._cull_frequency = 2
+        self.cache.set('forever', 0, None)
+        for number in range(4):
+            self.cache.set(number, number, 100 + number)
+        self.assertEqual(self.cache._count(), 3)
+        self.assertEqual(
+            self.other_process.get_many(['forever', 0, 1, 2, 3]),
+            {'forever': 0, 2: 2, 3: 3},
+        )
+
+
+class TemporaryCacheTests(SimpleTestCase):
+    def test_tests_do_not_use_shared_cache(self) -> None:
+        """Tests write to a throwaway cache, not the site's one."""
+        location: str = settings.CACHES['default']['LOCATION']
+        self.assertFalse(location.startswith(settings.BASE_DIR))
+        cache.set('key', 'value')
+        self.assertTrue(os.path.exists(location))
+
+
+class StampedeProtectionTests(SimpleTestCase):
+    THREADS: int = 8
+
+    def setUp(self) -> None:
+        self.directory: str = tempfile.mkdtemp()
+        self.cache: TieredCache = TieredCache(
+            os.path.join(self.directory, 'cache.sqlite3'),
+            {'OPTIONS': {'SYNC_INTERVAL': 0}},
+        )
+        self.calls: int = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def compute(self) -> str:
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return 'feed'
+
+    def test_single_recompute_under_load(self) -> None:
+        """Concurrent misses run the computation once."""
+        with ThreadPoolExecutor(self.THREADS) as executor:
+            results: list = list(executor.map(
+                lambda _: get_or_compute(
+                    'feed', self.compute, 20, cache=self.cache
+                ),
+                range(self.THREADS),
+            ))
+        self.assertEqual(results, ['feed'] * self.THREADS)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_during_refresh(self) -> None:
+        """While another request refreshes, the stale value is returned."""
+        self.cache.set('feed', ('stale', 0.1, time.time() - 1), 100)
+        self.cache.add(lock_key('feed'), True)
+        value: str = get_or_compute('feed', self.compute, 20, cache=self.cache)
+        self.assertEqual(value, 'stale')
+        self.assertEqual(self.calls, 0)
+
+
+class PrecompileTemplatesTests(SimpleTestCase):
+    def test_templates_loaded_into_cached_loader(self) -> None:
+        """Every project template is compiled before the first request."""
+        loader = engines['django'].engine.template_loaders[0]
+        loader.reset()
+        compiled: int = precompile_templates()
+        self.assertGreater(compiled, 0)
+        self.assertEqual(len(loader.get_template_cache), compiled)
+        self.assertIn(
+            'includes/posts/post_card.html', loader.get_template_cache
+        )
+
+
+class SQLitePragmasTests(TestCase):
+    def test_pragmas_applied_to_connection(self) -> None:
+        """New connections are configured from SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS['cache_size']
+            )
+
+
+@override_settings(SERVER_TIMING=True)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_server_timing_header(self) -> None:
+        """Responses carry SQL, template and total time."""
+        response: HttpResponse = self.client.get('/')
+        timing: str = response['Server-Timing']
+        for name in ('db', 'template', 'thumbnail', 'python', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+        self.assertNotIn('(0 queries)', timing)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0.001)
+    def test_slow_request_logged_with_queries(self) -> None:
+        """Requests above the threshold are logged with their queries."""
+        with self.assertLogs('core.profiling', 'WARNING') as logs:
+            self.client.get('/')
+        self.assertIn('Slow request GET /', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_nested_timers_are_exclusive(self) -> None:
+        """Time of a nested timer is not counted in the outer one."""
+        profile: Profile = Profile()
+        with mock.patch('core.profiling.current_profile',
+                        return_value=profile):
+            with timer('template'):
+                with timer('db'):
+                    time.sleep(0.05)
+        self.assertGreaterEqual(profile.times['db'], 0.05)
+        self.assertLess(profile.times['template'], 0.05)
+
+
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        metrics.registry.pending.clear()
+        directory: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        enabled = override_settings(
+            METRICS_ENABLED=True,
+            METRICS_TOKEN='secret',
+            METRICS_DATABASE=os.path.join(directory, 'metrics.sqlite3'),
+        )
+        enabled.enable()
+        self.addCleanup(enabled.disable)
+        # Counts left over must not reach the default database at exit.
+        self.addCleanup(metrics.registry.pending.clear)
+
+    def test_requests_and_caches_exposed(self) -> None:
+        """Requests, their latency and cache lookups are exposed."""
+        self.client.get('/')
+        response: HttpResponse = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        content: str = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      content)
+        self.assertIn(
+            'yatube_requests_total'
+            '{method="GET",status="200",view="posts:index"} 1',
+            content,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{le="+Inf",view="posts:index"} 1',
+            content,
+        )
+        self.assertIn(
+            'yatube_cache_requests_total'
+            '{cache="page",result="miss",tier="memory"}',
+            content,
+        )
+
+    def test_counts_of_processes_are_added(self) -> None:
+        """Counts flushed by other processes are added to our own."""
+        other: metrics.Registry = metrics.Registry()
+        other.inc('yatube_thumbnails_generated_total', 2)
+        other.flush()
+        metrics.registry.inc('yatube_thumbnails_generated_total')
+        self.assertIn(
+            'yatube_thumbnails_generated_total 3', metrics.render()
+        )
+
+    def test_token_required(self) -> None:
+        """Only scrapers with METRICS_TOKEN may read the metrics."""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response: HttpResponse = self.client.get(
+                    '/metrics', **headers
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.FORBIDDEN
+                )
+        with override_settings(METRICS_TOKEN=None):
+            response = self.client.get(
+                '/metrics', HTTP_AUTHORIZATION='Bearer None'
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router: ReplicaRouter = ReplicaRouter()
+        self.factory: RequestFactory = RequestFactory()
+        cache.delete(LAST_WRITE_KEY)
+
+    def handle(self, request, view):
+        middleware = ReadYourWritesMiddleware(lambda request: view())
+        return middleware(request)
+
+    def read(self) -> HttpResponse:
+        return HttpResponse(self.router.db_for_read(None))
+
+    def write(self) -> HttpResponse:
+        self.router.db_for_write(None)
+        return self.read()
+
+    @mock.patch('core.routers.is_fresh', return_value=True)
+    def test_reads_go_to_replica(self, is_fresh) -> None:
+        """Reads use a fresh replica, writes the primary."""
+        response = self.handle(self.factory.get('/'), self.read)
+        self.assertEqual(response.content, b'replica')
+        self.assertEqual(self.router.db_for_write(None), 'default')
+
+    @mock.patch('core.routers.is_fresh', return_value=False)
+    def test_stale_replica_skipped(self, is_fresh) -> None:
+        """A stale replica fails over to the primary."""
+        response = self.handle(self.factory.get('/'), self.read)
+        self.assertEqual(response.content, b'default')
+
+    @mock.patch('core.routers.is_fresh', return_value=True)
+    def test_session_reads_its_writes(self, is_fresh) -> None:
+        """After a write the session keeps reading from the primary."""
+        response = self.handle(self.factory.post('/'), self.write)
+        self.assertEqual(response.content, b'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        response = self.handle(request, self.read)
+        self.assertEqual(response.content, b'default')
+
+    @mock.patch('core.routers.is_fresh', return_value=True)
+    def test_everyone_reads_primary_after_write(self, is_fresh) -> None:
+        """Other sessions read from the primary for REPLICA_MAX_LAG."""
+        self.handle(self.factory.post('/'), self.write)
+        response = self.handle(self.factory.get('/'), self.read)
+        self.assertEqual(response.content, b'default')
+        with mock.patch(
+            'core.routers.time.time',
+            return_value=time.time() + settings.REPLICA_MAX_LAG + 2,
+        ):
+            response = self.handle(self.factory.get('/'), self.read)
+        self.assertEqual(response.content, b'replica')
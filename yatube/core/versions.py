@@ -0,0 +1,144 @@
+"""Version counters telling caches when objects and collections change.
+
+Every tracked model has a collection version, bumped whenever any of its
+rows changes, and a version per object. Queryset updates do not bump the
+objects they touch one by one but a generation shared by all objects of the
+model, which is part of every object version. Views and templates read the
+versions they depend on in a single ``get_many`` and use them in cache keys
+or validators; a bump makes everything keyed on the old value unreachable.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete, post_save
+
+COLLECTION = '*'
+GENERATION = 'generation'
+
+
+def version_key(model, pk=COLLECTION):
+    return f'version:{model._meta.label_lower}:{pk}'
+
+
+def initial_version():
+    # Counters start from the clock, so that a counter evicted from the
+    # cache never goes back to a value it already had.
+    return int(time.time() * 1000)
+
+
+def target_keys(target):
+    if isinstance(target, models.Model):
+        target = (type(target), target.pk)
+    if isinstance(target, tuple):
+        model, pk = target
+        return version_key(model, GENERATION), version_key(model, pk)
+    return version_key(target),
+
+
+def get_versions(*targets):
+    """Return the versions of model instances and classes, in order.
+
+    A model class stands for its whole collection, a ``(model, pk)`` pair
+    for an object that is not loaded. Object versions are tuples of the
+    model generation and the object counter, and compare as such.
+    """
+    targets_keys = [target_keys(target) for target in targets]
+    keys = list(dict.fromkeys(
+        key for target in targets_keys for key in target
+    ))
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), None)
+            versions[key] = cache.get(key, 0)
+    return [
+        tuple(versions[key] for key in target) if len(target) > 1
+        else versions[target[0]]
+        for target in targets_keys
+    ]
+
+
+def format_versions(versions):
+    """Join versions from :func:`get_versions` into one cache key part."""
+    return '.'.join(
+        str(part)
+        for version in versions
+        for part in (version if isinstance(version, tuple) else (version,))
+    )
+
+
+def _bump_keys(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, initial_version(), None):
+                cache.incr(key)
+
+
+def bump(model, *pks):
+    """Bump the collection version of ``model`` and of the given objects.
+
+    Inside a transaction the versions are bumped again on commit, so that
+    nothing read before the commit stays cached under the new version.
+    """
+    keys = [version_key(model)] + [version_key(model, pk) for pk in pks]
+    _bump_keys(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump_keys(keys))
+
+
+def bump_generation(model):
+    """Bump the collection and the versions of every object of ``model``.
+
+    Used where bumping the changed objects one by one would take a cache
+    write per row.
+    """
+    bump(model, GENERATION)
+
+
+class VersionedQuerySet(models.QuerySet):
+    """Bump versions on the bulk paths that send no model signals."""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            bump_generation(self.model)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        # New objects cannot be cached yet, only their collection changes.
+        bump(self.model)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        super().bulk_update(objs, fields, *args, **kwargs)
+        bump_generation(self.model)
+
+
+def track(model, parents=(), skip_fields=()):
+    """Keep versions of ``model`` up to date on save and delete.
+
+    ``parents`` names foreign keys whose objects change along with the
+    instance, e.g. a post when one of its comments is edited. Saves that
+    only touch ``skip_fields`` are ignored.
+    """
+    def bump_instance(sender, instance, update_fields=None, **kwargs):
+        if update_fields and set(update_fields) <= set(skip_fields):
+            return
+        bump(sender, instance.pk)
+        for name in parents:
+            field = sender._meta.get_field(name)
+            pk = getattr(instance, field.attname)
+            if pk is not None:
+                bump(field.related_model, pk)
+
+    uid = f'versions:{model._meta.label_lower}'
+    post_save.connect(bump_instance, sender=model, weak=False,
+                      dispatch_uid=uid)
+    post_delete.connect(bump_instance, sender=model, weak=False,
+                        dispatch_uid=uid)
@@ -1,5 +1,13 @@
-from django.http import HttpRequest, HttpResponse
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from . import metrics as app_metrics
 
 
 def page_not_found(request: HttpRequest, exception) -> HttpResponse:
@@ -16,3 +24,24 @@ def permission_denied(request: HttpRequest, exception) -> HttpResponse:
 
 def server_error(request: HttpRequest) -> HttpResponse:
     return render(request, 'core/500.html', status=500)
+
+
+@never_cache
+@require_safe
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Serve the metrics of all processes to holders of METRICS_TOKEN.
+
+    Scrapers send it as ``Authorization: Bearer <token>``. Without
+    metrics or a token configured the page does not exist.
+    """
+    token = settings.METRICS_TOKEN
+    if not (settings.METRICS_ENABLED and token):
+        raise Http404
+    if not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        raise PermissionDenied
+    return HttpResponse(
+        app_metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
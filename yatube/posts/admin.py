@@ -1,7 +1,12 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from .deletion import request_user_deletion
 from .models import Comment, Follow, Group, Post
 
+User = get_user_model()
+
 
 class PostAdmin(admin.ModelAdmin):
     list_display = (
@@ -46,7 +51,20 @@ class FollowAdmin(admin.ModelAdmin):
     list_filter = ('author', 'user')
 
 
+class UserAdmin(BaseUserAdmin):
+    """Deleting accounts hides them at once and queues the purge."""
+
+    def delete_model(self, request, obj):
+        request_user_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            request_user_deletion(user)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
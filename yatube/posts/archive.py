@@ -0,0 +1,110 @@
+"""Move old posts and their comments out of the hot tables.
+
+Feeds only read the hot ``Post`` table; post pages and profiles fall back
+to the archive, so archived posts keep their URLs.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+
+def copy_to(model, instance):
+    """Build a ``model`` object from the fields it shares with ``instance``."""
+    names = {field.attname for field in model._meta.concrete_fields}
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname in names:
+            value = getattr(instance, field.attname)
+            if isinstance(value, FieldFile):
+                value = value.name
+            values[field.attname] = value
+    return model(**values)
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.POST_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size):
+    """Archive up to ``batch_size`` of the oldest posts before ``cutoff``.
+
+    Returns the number of archived posts.
+    """
+    with transaction.atomic():
+        posts = list(
+            Post.objects.filter(pub_date__lt=cutoff).order_by('pub_date')[
+                :batch_size
+            ]
+        )
+        if not posts:
+            return 0
+        ArchivedPost.objects.bulk_create(
+            copy_to(ArchivedPost, post) for post in posts
+        )
+        ArchivedComment.objects.bulk_create(
+            copy_to(ArchivedComment, comment)
+            for comment in Comment.objects.filter(post__in=posts)
+        )
+        Post.objects.filter(pk__in=[post.pk for post in posts]).delete()
+    return len(posts)
+
+
+def find_post(post_id):
+    """Return ``(post, archived)``, looking in the archive second."""
+    for model, archived in ((Post, False), (ArchivedPost, True)):
+        try:
+            post = model.objects.select_related('author', 'group').get(
+                pk=post_id
+            )
+        except model.DoesNotExist:
+            continue
+        return post, archived
+    return None, False
+
+
+class PostsWithArchive:
+    """Hot posts followed by archived ones, as one list for Paginator.
+
+    Every archived post is older than every hot one, so the concatenation
+    keeps the ``-pub_date`` order.
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+        self._hot_count = None
+        self._count = None
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.hot.count()
+        return self._hot_count
+
+    def count(self):
+        if self._count is None:
+            self._count = self.hot_count() + self.archived.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        hot_count = self.hot_count()
+        posts = []
+        if start < hot_count:
+            posts.extend(self.hot[start:min(stop, hot_count)])
+        if stop > hot_count:
+            posts.extend(
+                self.archived[max(start - hot_count, 0):stop - hot_count]
+            )
+        return posts
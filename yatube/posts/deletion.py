@@ -0,0 +1,76 @@
+"""Soft deletion of accounts and the purger removing soft-deleted rows.
+
+Soft deletion only flips flags, so content disappears at once without
+cascading through thousands of rows in one transaction. The purger then
+deletes the rows in small batches, children before parents, so that every
+cascade it triggers stays small too.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.page_cache import purge_tags
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Post,
+                     UserPurge)
+
+User = get_user_model()
+
+
+def request_user_deletion(user):
+    """Deactivate ``user``, hide everything they wrote and queue the purge."""
+    posts = Post.objects.filter(author=user)
+    comments = Comment.objects.filter(author=user)
+    archived_posts = ArchivedPost.objects.filter(author=user)
+    archived_comments = ArchivedComment.objects.filter(author=user)
+    # Pages of the user's own posts carry the author tag.
+    tags = {'posts', f'author:{user.pk}'}
+    tags.update(
+        f'group:{group_id}'
+        for group_id in posts.values_list('group_id', flat=True).distinct()
+        if group_id
+    )
+    for queryset in (comments, archived_comments):
+        tags.update(
+            f'post:{post_id}'
+            for post_id in queryset.values_list(
+                'post_id', flat=True
+            ).distinct()
+        )
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        for queryset in (posts, comments, archived_posts, archived_comments):
+            queryset.update(is_deleted=True)
+        UserPurge.objects.get_or_create(user=user)
+    purge_tags(*tags)
+
+
+def purge_querysets():
+    """Rows to delete, in the order they have to go."""
+    pending = UserPurge.objects.values('user_id')
+    return (
+        Comment.all_objects.filter(is_deleted=True),
+        Comment.all_objects.filter(post__is_deleted=True),
+        Comment.all_objects.filter(post__author__in=pending),
+        ArchivedComment.all_objects.filter(author__in=pending),
+        ArchivedComment.all_objects.filter(post__author__in=pending),
+        ArchivedPost.all_objects.filter(author__in=pending),
+        Follow.objects.filter(user__in=pending),
+        Follow.objects.filter(author__in=pending),
+        Post.all_objects.filter(is_deleted=True),
+        User.objects.filter(pk__in=pending),
+    )
+
+
+def purge_batch(batch_size):
+    """Delete up to ``batch_size`` soft-deleted rows of a single kind.
+
+    Returns the number of deleted rows, 0 once there is nothing left.
+    """
+    for queryset in purge_querysets():
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if pks:
+            with transaction.atomic():
+                queryset.model._base_manager.filter(pk__in=pks).delete()
+            return len(pks)
+    return 0
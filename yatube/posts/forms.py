@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import ingest_image
 from .models import Comment, Post
 
 
@@ -8,6 +10,14 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            # Spares fill_image_details opening the image once more.
+            self.instance.ingested_image = ingest_image(image)
+            image = self.instance.ingested_image.file
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
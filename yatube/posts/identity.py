@@ -0,0 +1,110 @@
+import hashlib
+
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Follow
+
+IDENTITY_TIMEOUT = 300
+MISSING_TIMEOUT = 30
+MISSING = 'missing'
+# Fields kept in the cached copy of a model's objects, when not all of
+# them. Users are cached without their password hash.
+CACHED_FIELDS = {
+    'auth.user': ('id', 'username', 'first_name', 'last_name', 'is_active'),
+}
+
+
+def identity_key(model, field, value):
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'identity:{model._meta.label_lower}:{field}:{digest}'
+
+
+def identity_keys(instance, *fields):
+    return [
+        identity_key(type(instance), field, getattr(instance, field))
+        for field in ('pk', *fields)
+    ]
+
+
+def cached_queryset(model):
+    queryset = model._default_manager.all()
+    fields = CACHED_FIELDS.get(model._meta.label_lower)
+    return queryset if fields is None else queryset.only(*fields)
+
+
+def get_cached_or_404(model, **lookup):
+    """Cached ``get_object_or_404`` for a single unique field.
+
+    The looked up value maps to the pk of the object, which is cached under
+    its pk; misses are cached briefly so repeated 404s do not reach the
+    database either.
+    """
+    (field, value), = lookup.items()
+    key = identity_key(model, field, value)
+    pk = cache.get(key)
+    if pk == MISSING:
+        raise Http404(f'{model._meta.object_name} не найден')
+    instance = None
+    if pk is not None:
+        pk_key = identity_key(model, 'pk', pk)
+        instance = cache.get(pk_key)
+        if instance is None:
+            instance = cached_queryset(model).filter(pk=pk).first()
+            if instance is not None:
+                cache.set(pk_key, instance, IDENTITY_TIMEOUT)
+    # The object may have been renamed or deleted since.
+    if instance is None or str(getattr(instance, field)) != str(value):
+        instance = cached_queryset(model).filter(**lookup).first()
+        if instance is None:
+            cache.set(key, MISSING, MISSING_TIMEOUT)
+            raise Http404(f'{model._meta.object_name} не найден')
+        cache.set_many(
+            {key: instance.pk, identity_key(model, 'pk', instance.pk):
+             instance},
+            IDENTITY_TIMEOUT,
+        )
+    return instance
+
+
+def remember_old_values(instance, fields, update_fields=None):
+    """Keep the stored values of ``fields`` before ``instance`` is saved.
+
+    :func:`forget` then also drops the keys of the values being replaced.
+    """
+    fields = [
+        field for field in fields
+        if update_fields is None or field in update_fields
+    ]
+    if instance.pk is None or not fields:
+        return
+    instance._identity_old_values = (
+        type(instance)._base_manager.filter(pk=instance.pk)
+        .values(*fields).first() or {}
+    )
+
+
+def forget(instance, *fields):
+    keys = identity_keys(instance, *fields)
+    old_values = getattr(instance, '_identity_old_values', {})
+    keys.extend(
+        identity_key(type(instance), field, value)
+        for field, value in old_values.items()
+    )
+    cache.delete_many(keys)
+
+
+def follow_key(user_id, author_id):
+    return f'follow:{user_id}:{author_id}'
+
+
+def is_following(user, author):
+    """Cached check whether ``user`` follows ``author``."""
+    if not user.is_authenticated:
+        return False
+    key = follow_key(user.pk, author.pk)
+    following = cache.get(key)
+    if following is None:
+        following = Follow.objects.filter(user=user, author=author).exists()
+        cache.set(key, following, IDENTITY_TIMEOUT)
+    return following
@@ -0,0 +1,123 @@
+import base64
+import os
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageFilter, ImageOps
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+PLACEHOLDER_SIZE = 16
+# Image.info keys that encoders write back out, e.g. the EXIF block that
+# exif_transpose() leaves there for the PNG encoder.
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+IngestedImage = namedtuple('IngestedImage', 'file size placeholder')
+
+
+def read_header(image_file):
+    """Open the upload lazily: only the header is parsed, no pixels."""
+    image_file.seek(0)
+    try:
+        image = Image.open(image_file)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите корректное изображение.', code='invalid_image'
+        )
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Формат изображения %(format)s не поддерживается.',
+            code='invalid_format',
+            params={'format': image.format},
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: %(width)sx%(height)s.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+    return image
+
+
+def has_metadata(image):
+    return bool(image.info.get('exif') or image.getexif())
+
+
+def make_placeholder(image):
+    """Encode a blurred 16px preview of ``image`` as a data URI."""
+    preview = image.convert('RGB')
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    preview = preview.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    preview.save(buffer, 'JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def describe_image(image_file):
+    """Return the ``(width, height)`` and placeholder of a stored image."""
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        size = image.size
+        if image.format == 'JPEG':
+            image.draft('RGB', (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        return size, make_placeholder(image)
+
+
+def ingest_image(image_file):
+    """Validate an uploaded image, strip EXIF and downscale it.
+
+    Returns the file to store, its ``(width, height)`` and a placeholder
+    data URI. Images that are already small enough and carry no metadata
+    are stored byte for byte, animated images are never re-encoded.
+    """
+    if image_file.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Размер файла не должен превышать %(limit)s МБ.',
+            code='file_too_large',
+            params={'limit': settings.POST_IMAGE_MAX_UPLOAD_SIZE >> 20},
+        )
+    with read_header(image_file) as image:
+        image_format = image.format
+        max_size = settings.POST_IMAGE_MAX_DIMENSION
+        oversized = max(image.size) > max_size
+        if getattr(image, 'is_animated', False) or not (
+            oversized or has_metadata(image)
+        ):
+            size = image.size
+            if image_format == 'JPEG':
+                image.draft('RGB', (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            placeholder = make_placeholder(image)
+            image_file.seek(0)
+            return IngestedImage(image_file, size, placeholder)
+        if image_format == 'JPEG' and oversized:
+            # Let the JPEG decoder skip DCT coefficients we would throw
+            # away.
+            image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    buffer = BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    name = os.path.basename(image_file.name)
+    processed = InMemoryUploadedFile(
+        buffer,
+        'image',
+        name,
+        Image.MIME.get(image_format),
+        buffer.tell(),
+        None,
+    )
+    processed.seek(0)
+    return IngestedImage(processed, image.size, make_placeholder(image))
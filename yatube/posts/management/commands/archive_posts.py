@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Move posts older than POST_ARCHIVE_AFTER_DAYS, with their '
+        'comments, to the archive tables in small transactions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Archive posts older than this, overriding the setting.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Number of posts archived per transaction.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        archived = 0
+        while True:
+            batch = archive_batch(cutoff, options['batch_size'])
+            if not batch:
+                break
+            archived += batch
+            time.sleep(options['pause'])
+        self.stdout.write(f'Archived {archived} posts')
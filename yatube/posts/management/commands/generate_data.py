@@ -0,0 +1,258 @@
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.page_cache import purge_tags
+from posts.archive import archive_batch, archive_cutoff
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+VOCABULARY_SIZE = 3000
+FOLLOW_ATTEMPTS = 10
+PASSWORD = 'generated'
+# Posts per archive_batch() call, within SQLite's limit on query parameters.
+ARCHIVE_BATCH_SIZE = 500
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Let bulk inserts keep the dates we generate instead of now()."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def zipf_weights(count, exponent):
+    """Cumulative weights of ranks 1..count under a Zipf distribution."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a synthetic, seed-deterministic dataset: '
+        'users, groups, posts, comments and a power-law follow graph.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Average number of authors followed by a user.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=730,
+            help='Spread publication dates over this many past days.',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Exponent of the author and post popularity distribution.',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        from faker import Faker
+
+        self.rng = random.Random(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.fake = fake
+        self.words = fake.words(VOCABULARY_SIZE)
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        self.prefix = f'gen{options["seed"]}_'
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed.')
+        if (
+            User.objects.filter(username__startswith=self.prefix).exists()
+            or Group.objects.filter(slug__startswith=self.prefix).exists()
+        ):
+            raise CommandError(
+                f'Users or groups named {self.prefix}* already exist: '
+                f'this seed was generated before, use another --seed.'
+            )
+
+        users = self.step('users', self.create_users, options['users'])
+        groups = self.step('groups', self.create_groups, options['groups'])
+        author_weights = zipf_weights(len(users), options['zipf'])
+        posts = self.step(
+            'posts', self.create_posts,
+            options['posts'], users, author_weights, groups,
+        )
+        self.step(
+            'comments', self.create_comments,
+            options['comments'], users, posts, options['zipf'],
+        )
+        self.step(
+            'follows', self.create_follows,
+            options['follows'], users, author_weights,
+        )
+        self.step('archived', self.archive_posts)
+        purge_tags('posts', 'groups', 'users')
+
+    def step(self, label, create, *args):
+        start = time.perf_counter()
+        result = create(*args)
+        count = len(result) if isinstance(result, list) else result
+        self.stdout.write(
+            f'{label:<10} {count:>10} in {time.perf_counter() - start:.1f} s'
+        )
+        return result
+
+    def insert(self, model, objects):
+        """Insert ``objects`` in batches, returning the new primary keys."""
+        manager = model._base_manager
+        pks = []
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+                # SQLite does not return the keys of bulk inserts. The
+                # transaction holds the write lock from its first insert,
+                # so the batch got the last len(batch) consecutive keys.
+                last_pk = manager.order_by('-pk').values_list(
+                    'pk', flat=True
+                ).first()
+            pks.extend(range(last_pk - len(batch) + 1, last_pk + 1))
+        return pks
+
+    def archive_posts(self):
+        """Archive what ``archive_posts`` would have by now.
+
+        Feeds that fall back to the archive expect every archived post to
+        be older than every hot one, as it is in a live database.
+        """
+        cutoff = archive_cutoff()
+        archived = 0
+        while True:
+            batch = archive_batch(cutoff, ARCHIVE_BATCH_SIZE)
+            if not batch:
+                return archived
+            archived += batch
+
+    def text(self, low, high):
+        words = self.rng.choices(self.words, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def past_date(self):
+        return self.now - timedelta(days=self.rng.random() * self.days)
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        return self.insert(User, (
+            User(
+                username=f'{self.prefix}{number}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+                date_joined=self.past_date(),
+            )
+            for number in range(count)
+        ))
+
+    def create_groups(self, count):
+        return self.insert(Group, (
+            Group(
+                title=self.text(1, 3)[:200],
+                slug=f'{self.prefix}{number}',
+                description=self.text(5, 30),
+            )
+            for number in range(count)
+        ))
+
+    def create_posts(self, count, users, author_weights, groups):
+        dates = sorted(self.past_date() for _ in range(count))
+        with explicit_dates(
+            Post._meta.get_field('pub_date'), Post._meta.get_field('updated')
+        ):
+            posts = self.insert(Post, (
+                Post(
+                    author_id=self.rng.choices(
+                        users, cum_weights=author_weights
+                    )[0],
+                    group_id=(
+                        self.rng.choice(groups)
+                        if groups and self.rng.random() < 0.7 else None
+                    ),
+                    text=self.text(5, 120),
+                    pub_date=date,
+                    updated=date,
+                )
+                for date in dates
+            ))
+        self.post_dates = dict(zip(posts, dates))
+        return posts
+
+    def create_comments(self, count, users, posts, exponent):
+        if not posts:
+            return 0
+        # Newer posts, at the end of the list, get most of the comments.
+        weights = zipf_weights(len(posts), exponent)
+        newest_first = posts[::-1]
+
+        def comments():
+            for _ in range(count):
+                post = self.rng.choices(newest_first, cum_weights=weights)[0]
+                # Somewhere between the publication of the post and now.
+                published = self.post_dates[post]
+                yield Comment(
+                    post_id=post,
+                    author_id=self.rng.choice(users),
+                    text=self.text(2, 40),
+                    created=published
+                    + (self.now - published) * self.rng.random(),
+                )
+
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.insert(Comment, comments())
+        return count
+
+    def create_follows(self, average, users, author_weights):
+        """Every user follows a Pareto-distributed number of authors,
+        picked in proportion to their popularity."""
+        if len(users) < 2:
+            return 0
+        # With alpha = 2 the mean of the Pareto distribution is 2 * scale.
+        scale = average / 2
+        limit = len(users) - 1
+
+        def follows():
+            for user in users:
+                wanted = min(int(scale * self.rng.paretovariate(2)), limit)
+                authors = set()
+                for _ in range(FOLLOW_ATTEMPTS):
+                    if len(authors) >= wanted:
+                        break
+                    authors.update(self.rng.choices(
+                        users,
+                        cum_weights=author_weights,
+                        k=wanted - len(authors),
+                    ))
+                    authors.discard(user)
+                for author in sorted(authors):
+                    yield Follow(user_id=user, author_id=author)
+
+        return len(self.insert(Follow, follows()))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import purge_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete soft-deleted posts, comments and accounts in small '
+        'transactions. With --every it keeps running in the background.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Number of rows deleted per transaction.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help='Seconds to sleep between batches.',
+        )
+        parser.add_argument(
+            '--every', type=float,
+            help='Purge again after this many seconds, forever.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            purged = 0
+            while True:
+                batch = purge_batch(options['batch_size'])
+                if not batch:
+                    break
+                purged += batch
+                time.sleep(options['pause'])
+            self.stdout.write(f'Purged {purged} rows')
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.warmup import get_targets, warm
+
+
+class Command(BaseCommand):
+    help = 'Render the first pages of the busiest feeds to fill the caches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Number of pages to warm for every feed.',
+        )
+        parser.add_argument(
+            '--groups', type=int, default=5,
+            help='Number of groups with the most posts to warm.',
+        )
+        parser.add_argument(
+            '--authors', type=int, default=5,
+            help='Number of authors with the most posts to warm.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of worker threads.',
+        )
+        parser.add_argument(
+            '--host', default=settings.WARM_CACHE_HOST,
+            help='Host name the pages are requested for, as in ALLOWED_HOSTS.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        targets = get_targets(
+            pages=options['pages'],
+            groups=options['groups'],
+            authors=options['authors'],
+        )
+        failed = 0
+        for result in warm(targets, options['host'], options['workers']):
+            line = (
+                f'{result.target.label:<40} {result.status} '
+                f'{result.duration * 1000:8.1f} ms'
+            )
+            if result.status == 200:
+                self.stdout.write(line)
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(line))
+        summary = (
+            f'Warmed {len(targets) - failed} of {len(targets)} pages '
+            f'in {time.perf_counter() - start:.2f} s'
+        )
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:02
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import migrations
+
+from posts.images import describe_image
+
+
+def fill_image_placeholders(apps, schema_editor):
+    for name in ('Post', 'ArchivedPost'):
+        model = apps.get_model('posts', name)
+        posts = model._base_manager.exclude(image='').exclude(image=None)
+        for post in posts.filter(image_placeholder='').iterator():
+            try:
+                with post.image.open('rb'):
+                    (width, height), placeholder = describe_image(post.image)
+            except (OSError, SuspiciousFileOperation):
+                continue
+            model._base_manager.filter(pk=post.pk).update(
+                image_width=width,
+                image_height=height,
+                image_placeholder=placeholder,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_soft_delete'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_image_placeholders, migrations.RunPython.noop
+        ),
+    ]
@@ -1,10 +1,29 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.versions import VersionedQuerySet
+
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
-class Post(models.Model):
+class LiveManager(models.Manager.from_queryset(VersionedQuerySet)):
+    """Hide soft-deleted rows; ``all_objects`` still sees them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class SoftDeleteMixin:
+    def soft_delete(self):
+        """Hide the object at once, the purger deletes it later."""
+        self.is_deleted = True
+        # Only the flag: a full save would undo concurrent edits.
+        self.save(update_fields=['is_deleted'])
+
+
+class Post(SoftDeleteMixin, models.Model):
     text = models.TextField(
         verbose_name='Текст записи',
         help_text='Введите текст записи'
@@ -14,6 +33,10 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,13 +55,54 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Изображение',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
+        db_index=True,
         help_text='Можете загрузить изображение'
     )
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_placeholder = models.TextField(
+        verbose_name='Превью изображения',
+        blank=True,
+        editable=False
+    )
+    is_deleted = models.BooleanField(
+        verbose_name='Удалён',
+        default=False,
+        editable=False
+    )
+
+    objects = LiveManager()
+    all_objects = VersionedQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['is_deleted', '-pub_date'],
+                name='post_live_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'is_deleted', '-pub_date'],
+                name='post_author_live_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'is_deleted', '-pub_date'],
+                name='post_group_live_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -56,6 +120,8 @@ class Group(models.Model):
         db_index=True
     )
 
+    objects = VersionedQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Группа'
@@ -65,7 +131,7 @@ class Group(models.Model):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(SoftDeleteMixin, models.Model):
     post = models.ForeignKey(
         Post,
         related_name='comments',
@@ -83,9 +149,27 @@ class Comment(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    is_deleted = models.BooleanField(
+        verbose_name='Удалён',
+        default=False,
+        editable=False
+    )
+
+    objects = LiveManager()
+    all_objects = VersionedQuerySet.as_manager()
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'is_deleted', '-created'],
+                name='comment_post_live_created_idx'
+            ),
+            models.Index(
+                fields=['is_deleted'],
+                name='comment_deleted_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -116,9 +200,152 @@ class Follow(models.Model):
                 name='user_author_unique'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
         ordering = ('author',)
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
     def __str__(self) -> str:
         return f'{self.user.username} подписан на {self.author.username}'
+
+
+class ArchivedPost(models.Model):
+    """A post moved out of the hot table, see posts.archive.
+
+    Keeps the id of the original post, so its URLs stay valid.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст записи')
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        db_index=True
+    )
+    updated = models.DateTimeField(verbose_name='Дата изменения')
+    archived = models.DateTimeField(
+        verbose_name='Дата архивации',
+        auto_now_add=True
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='Группа'
+    )
+    image = models.ImageField(
+        verbose_name='Изображение',
+        upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+        null=True,
+        db_index=True
+    )
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина изображения',
+        blank=True,
+        null=True
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота изображения',
+        blank=True,
+        null=True
+    )
+    image_placeholder = models.TextField(
+        verbose_name='Превью изображения',
+        blank=True
+    )
+    is_deleted = models.BooleanField(
+        verbose_name='Удалён',
+        default=False,
+        editable=False
+    )
+
+    objects = LiveManager()
+    all_objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='archived_author_pub_date_idx'
+            ),
+        ]
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        related_name='comments',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='archived_comments',
+        on_delete=models.CASCADE,
+    )
+    text = models.TextField(
+        verbose_name='Комментарий:'
+    )
+    created = models.DateTimeField()
+    is_deleted = models.BooleanField(
+        verbose_name='Удалён',
+        default=False,
+        editable=False
+    )
+
+    objects = LiveManager()
+    all_objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='archived_post_created_idx'
+            ),
+        ]
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self) -> str:
+        return self.text[:15]
+
+
+class UserPurge(models.Model):
+    """An account queued for deletion by the purger."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='purge',
+        verbose_name='Пользователь'
+    )
+    requested = models.DateTimeField(
+        verbose_name='Дата запроса',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Удаление пользователя'
+        verbose_name_plural = 'Удаления пользователей'
+
+    def __str__(self) -> str:
+        return str(self.user_id)
@@ -0,0 +1,143 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from core.page_cache import purge_tags
+from core.versions import track
+
+from .identity import follow_key, forget, remember_old_values
+from .images import describe_image
+from .models import ArchivedPost, Comment, Follow, Group, Post
+
+logger = logging.getLogger(__name__)
+
+
+def release_image(name):
+    """Delete an image and its thumbnails once no post refers to it."""
+    if not name or any(
+        manager.filter(image=name).exists()
+        for manager in (Post.all_objects, ArchivedPost.all_objects)
+    ):
+        return
+    storage = Post._meta.get_field('image').storage
+    try:
+        delete_thumbnails(ImageFile(name, storage), delete_file=False)
+        storage.delete(name)
+    except (OSError, SuspiciousFileOperation):
+        logger.warning('Could not release image %s', name, exc_info=True)
+
+
+def post_tags(author_id, group_id):
+    tags = ['posts', f'author:{author_id}']
+    if group_id:
+        tags.append(f'group:{group_id}')
+    return tags
+
+
+@receiver(pre_save, sender=Post)
+def handle_replaced_post(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old = Post.all_objects.filter(pk=instance.pk).values(
+        'image', 'author_id', 'group_id'
+    ).first()
+    if old is None:
+        return
+    if old['image'] and old['image'] != instance.image.name:
+        transaction.on_commit(lambda: release_image(old['image']))
+    purge_tags(*post_tags(old['author_id'], old['group_id']))
+
+
+@receiver(pre_save, sender=Post)
+def fill_image_details(sender, instance, update_fields=None, **kwargs):
+    """Measure the image and make its placeholder, however it was set."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    image = instance.image
+    if not image:
+        instance.image_width = instance.image_height = None
+        instance.image_placeholder = ''
+        return
+    if image._committed and instance.image_placeholder:
+        return
+    ingested = getattr(instance, 'ingested_image', None)
+    try:
+        if not image._committed and ingested and ingested.file is image.file:
+            size, placeholder = ingested.size, ingested.placeholder
+        elif not image._committed:
+            size, placeholder = describe_image(image)
+        else:
+            with image.open('rb'):
+                size, placeholder = describe_image(image)
+    except (OSError, SuspiciousFileOperation):
+        logger.warning('Could not read image %s', image.name, exc_info=True)
+        return
+    instance.image_width, instance.image_height = size
+    instance.image_placeholder = placeholder
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    purge_tags(
+        f'post:{instance.pk}',
+        *post_tags(instance.author_id, instance.group_id),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    purge_tags(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def release_deleted_image(sender, instance, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(pre_save, sender=get_user_model())
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    remember_old_values(instance, ('username',), update_fields)
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, update_fields=None, **kwargs):
+    remember_old_values(instance, ('slug',), update_fields)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_user(sender, instance, update_fields=None, **kwargs):
+    forget(instance, 'username')
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        purge_tags('users')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group(sender, instance, **kwargs):
+    forget(instance, 'slug')
+    purge_tags('groups')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_follow(sender, instance, **kwargs):
+    cache.delete(follow_key(instance.user_id, instance.author_id))
+
+
+track(Post)
+track(Group)
+track(Comment, parents=('post',))
+track(get_user_model(), skip_fields=('last_login',))
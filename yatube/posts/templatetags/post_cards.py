@@ -0,0 +1,64 @@
+from django import template
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils.safestring import mark_safe
+
+from core.versions import format_versions, get_versions
+
+from ..models import Group, Post
+from ..thumbnails import prefetch_thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/posts/post_card.html'
+CARD_TIMEOUT = 60 * 60
+CARD_THUMBNAIL = ('960x339', {'upscale': True})
+
+
+def card_targets(post):
+    """Objects whose changes show on the card of ``post``."""
+    targets = [(Post, post.pk), (get_user_model(), post.author_id)]
+    if post.group_id is not None:
+        targets.append((Group, post.group_id))
+    return targets
+
+
+def card_keys(posts, variant):
+    """Return ``{pk: cache key}``, reading all versions in one go."""
+    targets = {post.pk: card_targets(post) for post in posts}
+    flat = [target for parts in targets.values() for target in parts]
+    versions = dict(zip(flat, get_versions(*flat)))
+    keys = {}
+    for pk, parts in targets.items():
+        version = format_versions(versions[target] for target in parts)
+        keys[pk] = f'post_card:{pk}:{version}:{variant}'
+    return keys
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Render the cards of ``posts``, reusing cached ones.
+
+    Cards are cached per version of the post, its author and its group,
+    so only cards showing something changed since they were rendered are
+    rendered again. All versions and all cards of a page are fetched with
+    a ``get_many`` each.
+    """
+    variant = '-'.join(
+        flag for flag in ('profile_html', 'group_html') if context.get(flag)
+    )
+    posts = list(posts)
+    keys = card_keys(posts, variant)
+    cards = cache.get_many(keys.values())
+    missing = [post for post in posts if keys[post.pk] not in cards]
+    if missing:
+        geometry, options = CARD_THUMBNAIL
+        prefetch_thumbnails(missing, geometry, **options)
+        card_template = context.template.engine.get_template(CARD_TEMPLATE)
+        rendered = {}
+        for post in missing:
+            with context.push(post=post):
+                rendered[keys[post.pk]] = card_template.render(context)
+        cache.set_many(rendered, CARD_TIMEOUT)
+        cards.update(rendered)
+    return mark_safe('\n<hr>\n'.join(cards[keys[post.pk]] for post in posts))
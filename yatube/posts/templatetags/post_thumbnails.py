@@ -0,0 +1,12 @@
+from django import template
+
+from ..thumbnails import prefetch_thumbnails as prefetch
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, geometry_string, **options):
+    """Warm the thumbnail records of a page before its thumbnail tags."""
+    prefetch(posts, geometry_string, **options)
+    return ''
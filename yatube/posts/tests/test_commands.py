@@ -0,0 +1,252 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import models
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_batch
+from ..deletion import request_user_deletion
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                      Post)
+from ..warmup import warm_in_background
+
+User = get_user_model()
+
+
+class WarmCacheCommandTests(TransactionTestCase):
+    def setUp(self) -> None:
+        self.user: AbstractBaseUser = User.objects.create_user(
+            username='Igor'
+        )
+        self.group: Group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=f'Пост {number}')
+            for number in range(15)
+        )
+        cache.clear()
+
+    def test_warm_cache_fills_page_cache(self) -> None:
+        """Warmed feeds are served without touching the database."""
+        out = StringIO()
+        call_command('warm_cache', pages=2, host='testserver', stdout=out)
+        self.assertIn('Warmed 6 of 6 pages', out.getvalue())
+        client: Client = Client()
+        urls = (
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                client.get(url)
+
+    @override_settings(WARM_CACHE_HOST='example.com',
+                       ALLOWED_HOSTS=['example.com'])
+    def test_startup_warm_up_uses_configured_host(self) -> None:
+        """The startup hook warms pages for WARM_CACHE_HOST."""
+        warm_in_background(pages=1).join()
+        client: Client = Client(HTTP_HOST='example.com')
+        with self.assertNumQueries(0):
+            client.get(reverse('posts:index'))
+
+
+class ArchivePostsCommandTests(TestCase):
+    def setUp(self) -> None:
+        self.user: AbstractBaseUser = User.objects.create_user(
+            username='Igor'
+        )
+        self.old_post: Post = Post.objects.create(
+            author=self.user, text='Старый пост'
+        )
+        Comment.objects.create(
+            post=self.old_post, author=self.user, text='Старый комментарий'
+        )
+        Post.objects.filter(pk=self.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        self.new_post: Post = Post.objects.create(
+            author=self.user, text='Новый пост'
+        )
+        cache.clear()
+
+    def test_old_posts_archived_and_still_served(self) -> None:
+        """Archived posts leave the feeds but keep their pages."""
+        out = StringIO()
+        call_command(
+            'archive_posts', days=365, batch_size=1, pause=0, stdout=out
+        )
+        self.assertIn('Archived 1 posts', out.getvalue())
+        self.assertQuerysetEqual(
+            Post.objects.all(), [self.new_post.pk], transform=lambda p: p.pk
+        )
+        self.assertTrue(ArchivedPost.objects.filter(
+            pk=self.old_post.pk
+        ).exists())
+        self.assertEqual(ArchivedComment.objects.count(), 1)
+        client: Client = Client()
+        self.assertNotContains(client.get(reverse('posts:index')), 'Старый')
+        response = client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.old_post.pk})
+        )
+        self.assertContains(response, 'Старый комментарий')
+        self.assertEqual(response.context['posts_number'], 2)
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        self.assertEqual(response.context['all_posts'], 2)
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Новый пост', 'Старый пост'],
+        )
+
+
+class PurgeDeletedCommandTests(TestCase):
+    def setUp(self) -> None:
+        self.user: AbstractBaseUser = User.objects.create_user(
+            username='Igor'
+        )
+        self.reader: AbstractBaseUser = User.objects.create_user(
+            username='Olga'
+        )
+        self.post: Post = Post.objects.create(
+            author=self.user, text='Тестовый пост'
+        )
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text=f'Текст {n}')
+            for n in range(5)
+        )
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.authorized_client: Client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def purge(self) -> str:
+        out = StringIO()
+        call_command('purge_deleted', batch_size=2, pause=0, stdout=out)
+        return out.getvalue()
+
+    def test_deleted_post_hidden_then_purged(self) -> None:
+        """A deleted post disappears at once and is purged later."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.authorized_client.get(
+            reverse('posts:post_delete', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(self.authorized_client.get(url).status_code, 404)
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(Post.all_objects.exists())
+        self.assertIn('Purged 6 rows', self.purge())
+        self.assertFalse(Post.all_objects.exists())
+        self.assertFalse(Comment.all_objects.exists())
+
+    def test_deleted_user_hidden_then_purged(self) -> None:
+        """Deleting an account hides its content, the purger removes it."""
+        request_user_deletion(self.user)
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, 'Тестовый пост')
+        self.purge()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Post.all_objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.reader.pk).exists())
+
+    def test_deleted_user_archive_hidden_then_purged(self) -> None:
+        """Archived posts and comments of a deleted account go at once."""
+        archive_batch(timezone.now() + timedelta(days=1), 10)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(Client().get(url), 'Текст 0')
+        request_user_deletion(self.reader)
+        self.assertNotContains(Client().get(url), 'Текст 0')
+        request_user_deletion(self.user)
+        self.assertEqual(Client().get(url).status_code, 404)
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.purge()
+        self.assertFalse(ArchivedPost.all_objects.exists())
+        self.assertFalse(ArchivedComment.all_objects.exists())
+
+    def test_admin_deletion_is_deferred(self) -> None:
+        """Deleting an account in the admin queues it for the purger."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        client.post(
+            reverse('admin:auth_user_delete', args=[self.user.pk]),
+            {'post': 'yes'},
+        )
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Post.objects.filter(author=self.user).exists())
+        self.purge()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+
+class GenerateDataCommandTests(TestCase):
+    def generate(self) -> list:
+        call_command(
+            'generate_data', users=20, groups=3, posts=50, comments=80,
+            follows=4, seed=7, stdout=StringIO(),
+        )
+        return list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text'
+        ))
+
+    def test_dataset_generated_deterministically(self) -> None:
+        """The requested amounts are created, the same for the same seed."""
+        first = self.generate()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(len(first) + ArchivedPost.objects.count(), 50)
+        self.assertEqual(
+            Comment.objects.count() + ArchivedComment.objects.count(), 80
+        )
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(
+            user=models.F('author')
+        ).exists())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+
+    def test_same_seed_twice_fails(self) -> None:
+        """A seed already generated is refused instead of half-applied."""
+        self.generate()
+        with self.assertRaises(CommandError):
+            self.generate()
+        self.assertEqual(User.objects.count(), 20)
+
+    def test_old_posts_generated_into_archive(self) -> None:
+        """Posts past POST_ARCHIVE_AFTER_DAYS end up archived."""
+        self.generate()
+        cutoff = timezone.now() - timedelta(
+            days=settings.POST_ARCHIVE_AFTER_DAYS
+        )
+        self.assertTrue(ArchivedPost.objects.exists())
+        self.assertFalse(Post.objects.filter(pub_date__lt=cutoff).exists())
+        self.assertLess(
+            ArchivedPost.objects.aggregate(
+                models.Max('pub_date')
+            )['pub_date__max'],
+            Post.objects.aggregate(models.Min('pub_date'))['pub_date__min'],
+        )
+
+    def test_comments_dated_after_their_post(self) -> None:
+        """Comments get past dates, never before their post."""
+        self.generate()
+        self.assertFalse(Comment.objects.filter(
+            created__lt=models.F('post__pub_date')
+        ).exists())
+        self.assertLess(
+            Comment.objects.aggregate(models.Min('created'))['created__min'],
+            timezone.now() - timedelta(days=1),
+        )
@@ -1,6 +1,8 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -9,6 +11,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.http import HttpResponse
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.forms import CommentForm, PostForm
 from posts.models import Comment, Group, Post
 
@@ -40,6 +43,8 @@ class PostsCreateFormTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        digest: str = hashlib.sha256(cls.small_gif).hexdigest()
+        cls.small_gif_name = f'posts/{digest[:2]}/{digest}.gif'
         cls.post_form = PostForm()
         cls.comment_form = CommentForm()
 
@@ -83,11 +88,89 @@ class PostsCreateFormTests(TestCase):
             Post.objects.filter(
                 group=form_data['group'],
                 text=form_data['text'],
-                image='posts/small.gif',
+                image=self.small_gif_name,
                 pk=posts_count + 1
             ).exists()
         )
 
+    @override_settings(POST_IMAGE_MAX_DIMENSION=100)
+    def test_create_post_ingests_image(self) -> None:
+        """Uploaded images are downscaled, stripped and measured."""
+        for image_format, mime in (('JPEG', 'jpeg'), ('PNG', 'png')):
+            with self.subTest(image_format=image_format):
+                text: str = f'Большая картинка {image_format}'
+                buffer = BytesIO()
+                exif = Image.Exif()
+                exif[0x010F] = 'Camera'
+                Image.new('RGB', (300, 150)).save(
+                    buffer, image_format, exif=exif
+                )
+                uploaded = SimpleUploadedFile(
+                    name=f'big.{mime}',
+                    content=buffer.getvalue(),
+                    content_type=f'image/{mime}'
+                )
+                self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    data={'text': text, 'image': uploaded},
+                )
+                post: Post = Post.objects.get(text=text)
+                self.assertEqual(
+                    (post.image_width, post.image_height), (100, 50)
+                )
+                self.assertTrue(post.image_placeholder.startswith(
+                    'data:image/jpeg;base64,'
+                ))
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, (100, 50))
+                    self.assertFalse(image.getexif())
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_create_post_rejects_large_upload(self) -> None:
+        """Uploads over the size cap do not create a post."""
+        posts_count: int = Post.objects.count()
+        uploaded = SimpleUploadedFile(
+            name='small.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        response: HttpResponse = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Слишком большой файл', 'image': uploaded},
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    @override_settings(
+        POST_IMAGE_MAX_UPLOAD_SIZE=10, FILE_UPLOAD_MAX_MEMORY_SIZE=0
+    )
+    def test_streamed_large_upload_is_rejected(self) -> None:
+        """Uploads cut at the cap on disk still fail validation."""
+        posts_count: int = Post.objects.count()
+        uploaded = SimpleUploadedFile(
+            name='small.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        response: HttpResponse = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Слишком большой файл', 'image': uploaded},
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    def test_create_post_checks_csrf(self) -> None:
+        """Post views parsing their own uploads still check the token."""
+        client: Client = Client(enforce_csrf_checks=True)
+        client.force_login(PostsCreateFormTests.user)
+        posts_count: int = Post.objects.count()
+        response: HttpResponse = client.post(
+            reverse('posts:post_create'), data={'text': 'Без токена'}
+        )
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertEqual(Post.objects.count(), posts_count)
+
     def test_update_post(self) -> None:
         """Post change with the post_id in the database."""
         posts_count: int = Post.objects.count()
@@ -1,10 +1,27 @@
+import shutil
+import tempfile
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.versions import get_versions
 
 from ..models import Comment, Group, Post
 
 User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 class PostModelTest(TestCase):
@@ -71,3 +88,113 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected
                 )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageStorageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.user: AbstractBaseUser = User.objects.create_user(
+            username='Boris'
+        )
+
+    def create_post(self, name: str) -> Post:
+        return Post.objects.create(
+            author=self.user,
+            text='Мем',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_identical_images_are_stored_once(self) -> None:
+        """Identical uploads share one file, removed with the last post."""
+        first: Post = self.create_post('first.gif')
+        second: Post = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+
+    def test_saving_fills_image_details(self) -> None:
+        """Images saved outside the form are measured too."""
+        post: Post = self.create_post('first.gif')
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        Post.objects.filter(pk=post.pk).update(image_placeholder='')
+        post = Post.objects.get(pk=post.pk)
+        post.save()
+        self.assertTrue(post.image_placeholder)
+        post.image = None
+        post.save()
+        self.assertEqual(
+            (post.image_width, post.image_height, post.image_placeholder),
+            (None, None, ''),
+        )
+
+
+class VersionsTest(TransactionTestCase):
+    def setUp(self) -> None:
+        self.user: AbstractBaseUser = User.objects.create_user(
+            username='auth'
+        )
+        self.post: Post = Post.objects.create(author=self.user, text='Пост')
+
+    def assertBumped(self, targets, action) -> None:
+        before = get_versions(*targets)
+        action()
+        after = get_versions(*targets)
+        for target, old, new in zip(targets, before, after):
+            with self.subTest(target=target):
+                self.assertGreater(new, old)
+
+    def test_save_and_delete_bump_versions(self) -> None:
+        """Saving or deleting bumps the object and its collection."""
+        self.post.text = 'Новый текст'
+        self.assertBumped((self.post, Post), self.post.save)
+        comment = Comment(post=self.post, author=self.user, text='Текст')
+        self.assertBumped((self.post, Comment), comment.save)
+        self.assertBumped((self.post, Post), self.post.delete)
+
+    def test_bulk_paths_bump_versions(self) -> None:
+        """Queryset updates and bulk writes bump versions too."""
+        self.assertBumped(
+            (self.post, Post),
+            lambda: Post.objects.filter(pk=self.post.pk).update(text='Да'),
+        )
+        self.assertBumped(
+            (Group,),
+            lambda: Group.objects.bulk_create(
+                [Group(title='Группа', slug='group', description='')]
+            ),
+        )
+
+    def test_update_bumps_generation_without_reading_rows(self) -> None:
+        """A queryset update costs one query, whatever the row count."""
+        Post.objects.bulk_create(
+            [Post(author=self.user, text='Пост') for _ in range(20)]
+        )
+        before = get_versions(self.post)
+        with self.assertNumQueries(1):
+            Post.objects.filter(author=self.user).update(text='Да')
+        self.assertGreater(get_versions(self.post), before)
+
+    def test_versions_bumped_again_on_commit(self) -> None:
+        """Values read inside a transaction are stale after the commit."""
+        with transaction.atomic():
+            self.post.save()
+            inside, = get_versions(self.post)
+        after, = get_versions(self.post)
+        self.assertGreater(after, inside)
+
+    def test_last_login_does_not_bump_user(self) -> None:
+        """Recording a login is not a change of the user."""
+        before = get_versions(self.user)
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(get_versions(self.user), before)
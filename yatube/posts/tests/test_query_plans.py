@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+APP_TABLES = ('posts_post', 'posts_group', 'posts_comment', 'posts_follow')
+# The follow feed merges the posts of every followed author: it reads them
+# through post_author_live_pub_date_idx and sorts only those rows, which
+# beats walking all posts by date for anyone following few authors.
+ALLOWED_STEPS = {
+    'posts:follow_index': ('USE TEMP B-TREE FOR ORDER BY',),
+}
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, allowed=()):
+    """Steps of the plan that scan a table or sort in a temporary B-tree."""
+    problems = []
+    for step in explain(sql):
+        if step in allowed:
+            continue
+        if 'USE TEMP B-TREE' in step:
+            problems.append(step)
+        elif step.startswith('SCAN') and 'INDEX' not in step and any(
+            table in step.split() for table in APP_TABLES
+        ):
+            problems.append(step)
+    return problems
+
+
+@override_settings(PAGE_CACHE_AUTHENTICATED=False)
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user: AbstractBaseUser = User.objects.create_user(username='Igor')
+        cls.author: AbstractBaseUser = User.objects.create_user(
+            username='Olga'
+        )
+        cls.group: Group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post: Post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self) -> None:
+        self.authorized_client: Client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_views_use_indexes(self) -> None:
+        """Feed queries neither scan tables nor sort in temporary B-trees."""
+        views = {
+            'posts:index': {},
+            'posts:group_list': {'slug': self.group.slug},
+            'posts:profile': {'username': self.author.username},
+            'posts:post_detail': {'post_id': self.post.pk},
+            'posts:follow_index': {},
+        }
+        for name, kwargs in views.items():
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(reverse(name, kwargs=kwargs))
+            allowed = ALLOWED_STEPS.get(name, ())
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                with self.subTest(view=name, sql=query['sql']):
+                    self.assertEqual(
+                        plan_problems(query['sql'], allowed), []
+                    )
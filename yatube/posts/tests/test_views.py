@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django import forms
 from django.conf import settings
@@ -7,11 +8,14 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.http import HttpResponse
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 
-from ..models import Group, Post
+from ..models import Comment, Group, Post
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -141,6 +145,141 @@ class PostsViewsTests(TestCase):
             only_post: Post = response.context['page_obj'][0]
             self.assertEqual(only_post.image, self.post.image)
 
+    def test_author_and_group_lookups_cached(self) -> None:
+        """Authors and groups are looked up once, misses are cached too."""
+        urls: list = [
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        ]
+        for url in urls:
+            self.guest_client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.guest_client.get(url)
+            with self.subTest(url=url):
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'WHERE "auth_user"."username"' in query['sql']
+                    or 'WHERE "posts_group"."slug"' in query['sql']
+                ])
+        url: str = reverse('posts:profile', kwargs={'username': 'Newcomer'})
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+        User.objects.create_user(username='Newcomer')
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_renamed_objects_leave_old_urls(self) -> None:
+        """Old usernames and slugs stop resolving once renamed."""
+        old_urls: list = [
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        ]
+        for url in old_urls:
+            self.guest_client.get(url)
+        user: User = User.objects.get(pk=self.user.pk)
+        user.username = 'Renamed'
+        user.save()
+        group: Group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        for url in old_urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.authorized_client.get(url).status_code, 404
+                )
+
+    def test_post_cards_cached_per_version(self) -> None:
+        """Cards are rendered again only after their post changes."""
+        url: str = reverse('posts:search') + '?search=Тестовый'
+        self.guest_client.get(url)
+        response: HttpResponse = self.guest_client.get(url)
+        self.assertTemplateNotUsed(response, 'includes/posts/post_card.html')
+        post: Post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Тестовый пост, исправленный'
+        post.save()
+        response = self.guest_client.get(url)
+        self.assertTemplateUsed(response, 'includes/posts/post_card.html')
+        self.assertContains(response, 'Тестовый пост, исправленный')
+
+    def test_post_cards_follow_author_and_group(self) -> None:
+        """Renaming the author or the group renders the cards again."""
+        url: str = reverse('posts:search') + '?search=Тестовый'
+        self.guest_client.get(url)
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        response: HttpResponse = self.guest_client.get(url)
+        self.assertTemplateUsed(response, 'includes/posts/post_card.html')
+        Group.objects.filter(pk=self.group.pk).update(title='Новое имя')
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Новое имя')
+
+    def test_anonymous_pages_cached_until_purged(self) -> None:
+        """Anonymous pages come from cache until their data changes."""
+        url: str = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        self.assertContains(self.guest_client.get(url), 'Новый комментарий')
+        self.authorized_client.get(url)
+        response: HttpResponse = self.authorized_client.get(url)
+        self.assertIsNotNone(response.context)
+
+    def test_authenticated_pages_share_body_with_holes(self) -> None:
+        """Group pages are shared by users, the header is per user."""
+        url: str = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+        other: Client = Client()
+        other.force_login(User.objects.create_user(username='Olga'))
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response: HttpResponse = other.get(url)
+        self.assertTemplateNotUsed(response, 'posts/group_list.html')
+        self.assertTemplateUsed(response, 'includes/header.html')
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in queries.captured_queries
+        ))
+        self.assertContains(response, '<strong>Olga</strong>')
+        self.assertNotContains(response, '<strong>Igor</strong>')
+        self.assertNotContains(response, '<!--hole:')
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_cached_pages_follow_new_and_deleted_posts(self) -> None:
+        """Fragments cached before a purge do not outlive it."""
+        url: str = reverse('posts:index')
+        self.guest_client.get(url)
+        post: Post = Post.objects.create(author=self.user, text='Свежий пост')
+        self.assertContains(self.guest_client.get(url), 'Свежий пост')
+        post.soft_delete()
+        self.assertNotContains(self.guest_client.get(url), 'Свежий пост')
+
+    def test_thumbnail_records_prefetched(self) -> None:
+        """Thumbnail records of a page are read with a single query."""
+        for color in ('red', 'green', 'blue'):
+            buffer = BytesIO()
+            Image.new('RGB', (4, 4), color).save(buffer, 'PNG')
+            Post.objects.create(
+                author=self.user,
+                text=color,
+                image=SimpleUploadedFile(
+                    f'{color}.png', buffer.getvalue(), 'image/png'
+                ),
+            )
+        self.guest_client.get(reverse('posts:index'))
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index'))
+        kvstore_queries: list = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PaginatorViewsTest(TestCase):
@@ -0,0 +1,50 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             TemporaryFileUploadHandler)
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to a temporary file, writing at most the size cap.
+
+    Oversized bodies are still consumed, but nothing past the cap hits the
+    disk. The reported size is the real one, so form validation rejects it;
+    only views that check it should use the handler, see
+    :func:`bounded_uploads`.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+
+def bounded_uploads(view):
+    """Parse the uploads of ``view`` with the bounded handler.
+
+    Upload handlers must be set before anything reads the body, the CSRF
+    middleware included, so the view checks the CSRF token itself.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [
+            MemoryFileUploadHandler(request),
+            BoundedTemporaryFileUploadHandler(request),
+        ]
+        return protected(request, *args, **kwargs)
+
+    return wrapper
@@ -4,49 +4,69 @@ from django.db.models import Q
 from django.db.models import Value as V
 from django.db.models.functions import Concat
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 
+from core.page_cache import add_cache_tags
+from core.versions import format_versions, get_versions
 
+from .archive import PostsWithArchive, find_post
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post
+from .identity import get_cached_or_404, is_following
+from .models import ArchivedPost, Comment, Follow, Group, Post
 from .utils import get_paginator
 from .serializers import PostSerializer
+from .uploads import bounded_uploads
 
 TITLE_FIRST_CHARS = 30
 
 
+def feed_version():
+    """Key part for fragments listing post cards.
+
+    Page cache purges do not reach cached fragments, so the fragments are
+    keyed on everything their cards show, lest a purged page be rebuilt
+    from them.
+    """
+    return format_versions(get_versions(Post, User, Group))
+
+
 def index(request):
+    add_cache_tags(request, 'posts', 'groups', 'users', holes=True)
     posts = Post.objects.all()
     context = {
         'page_obj': get_paginator(request, posts),
+        'feed_version': feed_version(),
     }
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = get_cached_or_404(Group, slug=slug)
+    add_cache_tags(
+        request, f'group:{group.pk}', 'groups', 'users', holes=True
+    )
     posts = group.posts.all()
     context = {
         'group': group,
         'page_obj': get_paginator(request, posts),
+        'feed_version': feed_version(),
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(
-        author=author
-    ).all()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user.id,
-        author=author
-    ).exists()
+    author = get_cached_or_404(User, username=username)
+    add_cache_tags(request, f'author:{author.pk}', 'groups', 'users')
+    posts = PostsWithArchive(
+        Post.objects.filter(author=author),
+        ArchivedPost.objects.filter(author=author),
+    )
     context = {
         'author': author,
         'page_obj': get_paginator(request, posts),
         'all_posts': posts.count(),
-        'following': following,
+        'feed_version': feed_version(),
+        'following': is_following(request.user, author),
     }
     return render(request, 'posts/profile.html', context)
 
@@ -60,7 +80,7 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
-        return redirect('posts:post_detail', post_id)
+    return redirect('posts:post_detail', post_id)
 
 
 @login_required
@@ -83,28 +103,35 @@ def edit_comment(request, post_id, comment_id):
 def delete_comment(requset, post_id, comment_id):
     comment = get_object_or_404(Comment, id=comment_id)
     if requset.user == comment.author:
-        comment.delete()
+        comment.soft_delete()
     return redirect('posts:post_detail', post_id)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    posts_number = Post.objects.select_related(
-        'author'
-    ).filter(author__username=post.author).count()
+    add_cache_tags(request, f'post:{post_id}', 'groups', 'users')
+    post, archived = find_post(post_id)
+    if post is None:
+        raise Http404('Пост не найден')
+    add_cache_tags(request, f'author:{post.author_id}')
+    posts_number = (
+        Post.objects.filter(author_id=post.author_id).count()
+        + ArchivedPost.objects.filter(author_id=post.author_id).count()
+    )
     title = post.text[:TITLE_FIRST_CHARS]
     context = {
         'post': post,
+        'archived': archived,
         'title': title,
         'posts_number': posts_number,
         'image': post.image or None,
         'form': CommentForm(request.POST or None),
-        'comments': post.comments.all(),
+        'comments': post.comments.select_related('author'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@bounded_uploads
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -122,11 +149,12 @@ def post_create(request):
 def post_detele(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user == post.author:
-        post.delete()
+        post.soft_delete()
     return render(request, 'posts/delete_post.html')
 
 
 @login_required
+@bounded_uploads
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
@@ -160,7 +188,7 @@ def profile_follow(request, username):
     if request.user.username != username:
         Follow.objects.get_or_create(
             user=request.user,
-            author=get_object_or_404(User, username=username)
+            author=get_cached_or_404(User, username=username)
         )
     return redirect('posts:profile', username)
 
@@ -169,7 +197,7 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     Follow.objects.filter(
         user=request.user,
-        author=get_object_or_404(User, username=username)
+        author=get_cached_or_404(User, username=username)
     ).delete()
     return redirect('posts:profile', username)
 
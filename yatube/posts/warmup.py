@@ -0,0 +1,126 @@
+"""Fill the caches of the most visited pages ahead of real traffic."""
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_to_bytes, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+
+from .models import Group
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+Target = namedtuple('Target', 'label url')
+WarmResult = namedtuple('WarmResult', 'target status duration')
+
+
+def paged(label, url, pages):
+    """Targets for the first ``pages`` pages of a paginated feed."""
+    yield Target(label, url)
+    for page in range(2, pages + 1):
+        yield Target(f'{label}, page {page}', f'{url}?page={page}')
+
+
+def get_targets(pages=3, groups=5, authors=5):
+    """Index, the biggest groups and the most prolific authors."""
+    targets = list(paged('index', reverse('posts:index'), pages))
+    top_groups = Group.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count', 'pk')[:groups]
+    for group in top_groups:
+        targets.extend(paged(
+            f'group {group.slug}',
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            pages,
+        ))
+    top_authors = User.objects.annotate(
+        posts_count=Count('posts')
+    ).filter(posts_count__gt=0).order_by('-posts_count', 'pk')[:authors]
+    for author in top_authors:
+        targets.extend(paged(
+            f'profile {author.username}',
+            reverse('posts:profile', kwargs={'username': author.username}),
+            pages,
+        ))
+    return targets
+
+
+def warm_target(handler, target, host):
+    """Render ``target`` as an anonymous visitor would.
+
+    Going through the whole stack fills the page cache as well as the
+    fragment, post card, identity and thumbnail caches it relies on. The
+    request is handed to a WSGI handler like one from the server; the
+    test client would reconnect the global request signals under the
+    requests the process is serving meanwhile.
+    """
+    url = urlsplit(target.url)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        # PEP 3333 wants the undecoded path as a latin-1 string.
+        'PATH_INFO': unquote_to_bytes(url.path).decode('iso-8859-1'),
+        'QUERY_STRING': url.query,
+        'HTTP_HOST': host,
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    start = time.perf_counter()
+    try:
+        response = handler(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+    finally:
+        connections.close_all()
+    return WarmResult(
+        target, int(statuses[0].split()[0]), time.perf_counter() - start
+    )
+
+
+def warm(targets, host='localhost', workers=4):
+    """Warm ``targets`` in ``workers`` threads, yielding results in order."""
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            lambda target: warm_target(handler, target, host), targets
+        )
+
+
+def warm_in_background(host=None, workers=4, **target_options):
+    """Start warming the caches without delaying the process startup.
+
+    Pages are requested for ``host``, WARM_CACHE_HOST by default.
+    """
+    host = host or settings.WARM_CACHE_HOST
+
+    def run():
+        try:
+            start = time.perf_counter()
+            targets = get_targets(**target_options)
+            results = list(warm(targets, host, workers))
+            logger.info(
+                'Warmed %d pages in %.2f s',
+                len(results),
+                time.perf_counter() - start,
+            )
+        except Exception:
+            logger.exception('Cache warm-up failed')
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name='warm-cache', daemon=True)
+    thread.start()
+    return thread
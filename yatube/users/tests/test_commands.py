@@ -0,0 +1,33 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+
+class CleanupSessionsCommandTests(TestCase):
+    def test_expired_sessions_deleted(self) -> None:
+        """Only expired sessions are deleted, batch after batch."""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f'expired{number}',
+                session_data='',
+                expire_date=now - timedelta(days=1),
+            )
+            for number in range(5)
+        )
+        Session.objects.create(
+            session_key='active',
+            session_data='',
+            expire_date=now + timedelta(days=1),
+        )
+        out = StringIO()
+        call_command('cleanup_sessions', batch_size=2, pause=0, stdout=out)
+        self.assertIn('Deleted 5 expired sessions', out.getvalue())
+        self.assertQuerysetEqual(
+            Session.objects.values_list('pk', flat=True), ['active'],
+            transform=str,
+        )
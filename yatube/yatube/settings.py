@@ -7,6 +7,10 @@ load_dotenv()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 'X-Sendfile' (Apache, lighttpd) or 'X-Accel-Redirect' (nginx) hands media
+# transfers over to the front server.
+MEDIA_SENDFILE_HEADER = os.getenv('MEDIA_SENDFILE_HEADER')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
 SECRET_KEY = os.getenv('SECRET_KEY')
 DEBUG = False
 ALLOWED_HOSTS = [
@@ -34,22 +38,34 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.routers.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.page_cache.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Sessions are read from the cache and written through to the database, so
+# a request only touches django_session when its session changes. Expired
+# rows are removed by `manage.py cleanup_sessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates that report their render time to the profiler.
+        'BACKEND': 'core.profiling.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
+        # With DEBUG off Django wraps these loaders in the cached loader,
+        # which core.precompile fills at startup.
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -73,12 +89,86 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DATABASE_REPLICAS=/var/db/replica1.sqlite3,... Local
+# SQLite copies are refreshed by `manage.py sync_replicas`.
+REPLICA_DATABASES = []
+for number, path in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_MAX_LAG = int(os.getenv('REPLICA_MAX_LAG', 30))
+REPLICA_CHECK_INTERVAL = 1
+READ_YOUR_WRITES_WINDOW = 2 * REPLICA_MAX_LAG
+
+# Applied to every SQLite connection by core.db.configure_sqlite. WAL lets
+# readers work while a write is in progress, busy_timeout makes writers
+# queue up instead of failing with "database is locked". None skips one.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Negative values are in KiB: 64 MiB of page cache per connection.
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)),
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'memory'),
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_BYTES': 32 * 1024 * 1024,
+            'SYNC_INTERVAL': 1.0,
+        },
     }
 }
 
+# Tests get a throwaway cache location, see core.testing.
+TEST_RUNNER = 'core.testing.TestRunner'
+
+PAGE_CACHE_TIMEOUT = 10 * 60
+PAGE_CACHE_AUTHENTICATED = True
+WARM_CACHE_ON_STARTUP = os.getenv('WARM_CACHE_ON_STARTUP') == '1'
+# Page cache keys include the host, so pages have to be warmed for the one
+# visitors use. Defaults to the first ALLOWED_HOSTS entry without wildcards.
+WARM_CACHE_HOST = os.getenv('WARM_CACHE_HOST') or next(
+    (host for host in ALLOWED_HOSTS if not host.startswith(('*', '.'))),
+    'localhost',
+)
+
+# Per-request timings, see core.profiling. The Server-Timing header shows
+# query counts and timings to every client, so it is off unless debugging.
+# Requests taking longer than SLOW_REQUEST_THRESHOLD milliseconds are
+# logged with their top queries; 0 disables the log.
+SERVER_TIMING = os.getenv('SERVER_TIMING') == '1'
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 0))
+SLOW_REQUEST_TOP_QUERIES = 5
+
+# Prometheus metrics served at /metrics, see core.metrics. Processes add
+# their counts to the shared METRICS_DATABASE every METRICS_FLUSH_INTERVAL
+# seconds. Scrapers authenticate with ``Authorization: Bearer`` and
+# METRICS_TOKEN; without a token the endpoint is disabled.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+METRICS_DATABASE = os.getenv(
+    'METRICS_DATABASE', os.path.join(BASE_DIR, 'metrics.sqlite3')
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Posts older than this are moved to the archive by `manage.py archive_posts`.
+POST_ARCHIVE_AFTER_DAYS = int(os.getenv('POST_ARCHIVE_AFTER_DAYS', 365))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,6 +207,14 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Post images
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_DIMENSION = 1920
+POST_IMAGE_MAX_PIXELS = 50_000_000
+
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
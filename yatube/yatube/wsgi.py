@@ -5,3 +5,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+from core.precompile import precompile_templates  # noqa: E402
+
+precompile_templates()
+
+if settings.WARM_CACHE_ON_STARTUP:
+    from posts.warmup import warm_in_background
+    warm_in_background()